@@ -1,28 +1,72 @@
+import json
 import os
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict, List
-
-from core_ai.rag_pipeline.ingestion.load_documents import load_documents
-from core_ai.rag_pipeline.indexing.index_manager import ingest_documents
-from core_ai.agent_system.orchestrator import run
+from typing import Any, Dict, List, Literal, Optional, Union
+
+# Only stdlib-level modules at import time: llama_index, Qdrant, torch etc. are imported by the
+# handlers (or the warmup thread) that need them, so the process is serving /health immediately.
+from core_ai.observability.metrics import (
+    REQUEST_SECONDS,
+    REQUESTS_TOTAL,
+    render_prometheus,
+    request_timings,
+)
+from core_ai.rag_pipeline.indexing.tenancy import UnknownKnowledgeBase, kb_data_dir, resolve_kb, use_kb
+from core_ai.startup import readiness, start_warmup
 
 # Loads .env from project root (when running from root)
 load_dotenv()
 
-app = FastAPI(title="Enterprise Knowledge Copilot API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load models/index in the background; /ready reports progress per component
+    if os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true":
+        start_warmup()
+    yield
+
+
+app = FastAPI(title="Enterprise Knowledge Copilot API", lifespan=lifespan)
 
 
 class AskRequest(BaseModel):
     question: str
     top_k: int = 4
+    debug: bool = False  # include per-stage timings (ms) in the response
+    collection: Optional[str] = None  # knowledge base (default: QDRANT_COLLECTION)
+    tenant: Optional[str] = None  # tenant inside a shared collection (metadata-filtered)
+
+
+class BatchItem(BaseModel):
+    question: str
+    id: Optional[Any] = None  # echoed back, e.g. a ticket number
+
+
+class AskBatchRequest(BaseModel):
+    questions: List[Union[str, BatchItem]]
+    collection: Optional[str] = None
+    tenant: Optional[str] = None
+    order: Literal["input", "completed"] = "input"
+    llm_concurrency: Optional[int] = None  # default and maximum: ASK_BATCH_LLM_CONCURRENCY
 
 
 class AskResponse(BaseModel):
     agent: str
     answer: str
     sources: List[Dict[str, Any]]
+    timings: Optional[Dict[str, float]] = None
+
+
+def _kb(collection: Optional[str], tenant: Optional[str]):
+    try:
+        return resolve_kb(collection, tenant)
+    except UnknownKnowledgeBase as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @app.get("/health")
@@ -33,41 +77,174 @@ def health():
 @app.get("/ready")
 def ready():
     """
-    Real readiness: verifies embed model + index can be loaded.
-    CI uses this to know when it is safe to run evaluation.
+    Real readiness: 200 once the warmup has loaded every required component
+    (READY_COMPONENTS), 503 with per-component state before that.
+    Failed components (e.g. Qdrant was not up yet) are retried on the next call.
     """
+    start_warmup(retry_failed=True)
+    status = readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """
+    Hit/miss counters for the query-embedding and answer caches.
+    """
+    from core_ai.rag_pipeline.retrieval.cache import cache_stats
+
+    return cache_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus text format: per-stage and end-to-end latency histograms,
+    request counters and ingestion counters.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/ingest", status_code=202)
+def ingest(collection: Optional[str] = None, tenant: Optional[str] = None):
+    """
+    Starts an incremental ingest in the background and returns its job ID immediately.
+    Poll GET /ingest/{job_id} for progress; only one job runs per knowledge base (409 otherwise).
+    FAQ entries whose source chunks changed are regenerated at the end of the job.
+    ?collection=&tenant= pick the knowledge base; its files are read from DATA_DIR (default
+    collection) or KB_DATA_ROOT/<collection>[/<tenant>].
+    """
+    from core_ai.agent_system.faq_builder import refresh_faq
+    from core_ai.rag_pipeline.ingestion.jobs import JobConflict, start_ingest_job
+
+    collection, tenant = _kb(collection, tenant)
     try:
-        from core_ai.rag_pipeline.indexing.embeddings import get_embed_model
-        from core_ai.rag_pipeline.indexing.index_manager import get_index
+        job = start_ingest_job(kb_data_dir(collection, tenant), collection, on_complete=refresh_faq, tenant=tenant)
+    except JobConflict as e:
+        return JSONResponse(status_code=409, content={"detail": str(e), "job_id": e.job_id})
 
-        get_embed_model()
-        get_index()
-        return {"ready": True}
-    except Exception as e:
-        return {"ready": False, "error": str(e)}
+    return {"message": "Ingestion started", **job.to_dict()}
 
 
-@app.post("/ingest")
-def ingest():
-    data_dir = os.getenv("DATA_DIR", "./data/raw_documents")
-    docs = load_documents(data_dir)
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: str):
+    """
+    Files processed, chunks embedded, throughput and ETA of an ingest job.
+    Once finished, "result" holds the added/updated/skipped/deleted counts.
+    """
+    from core_ai.rag_pipeline.ingestion.jobs import get_job
+
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job: {job_id}")
+    return job.to_dict()
 
-    if not docs:
-        return {
-            "message": f"No documents found in {data_dir}",
-            "documents": 0,
-        }
 
-    result = ingest_documents(docs)
-    return {"message": "Ingestion complete", **result}
+@app.delete("/ingest/{job_id}")
+def ingest_cancel(job_id: str):
+    from core_ai.rag_pipeline.ingestion.jobs import cancel_job
+
+    job = cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job: {job_id}")
+    return job.to_dict()
 
 
 @app.post("/ask", response_model=AskResponse)
-def ask(req: AskRequest):
+async def ask(req: AskRequest):
     """
     Agent router endpoint:
     - chooses kb_answer / troubleshooting / ticket_writer / clarifier
     - returns {agent, answer, sources}
+    Fully async: Qdrant search and LLM generation are awaited on shared, pooled clients.
+    With "debug": true the response also carries per-stage timings in ms.
+    "collection" / "tenant" select the knowledge base (default: QDRANT_COLLECTION).
+    """
+    from core_ai.agent_system.orchestrator import arun
+
+    collection, tenant = _kb(req.collection, req.tenant)
+    start = time.perf_counter()
+    with request_timings() as timings, use_kb(collection, tenant):
+        result = await arun(req.question)
+
+    elapsed = time.perf_counter() - start
+    REQUEST_SECONDS.observe(elapsed, endpoint="/ask")
+    REQUESTS_TOTAL.inc(endpoint="/ask", agent=result["agent"])
+    if req.debug:
+        result["timings"] = {**timings, "total": round(elapsed * 1000, 2)}
+    return result
+
+
+async def _batch_request(request: Request) -> AskBatchRequest:
+    # JSON body {"questions": [...], ...}, or a JSONL upload (one question string or
+    # {"question", "id"} object per line) with the options as query parameters
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            return AskBatchRequest(**await request.json())
+        body = (await request.body()).decode("utf-8")
+        items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        return AskBatchRequest(questions=items, **dict(request.query_params))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {e}")
+
+
+@app.post("/ask/batch")
+async def ask_batch(request: Request):
+    """
+    Bulk /ask: all questions are embedded in one pass, searches are batched, identical
+    questions and identical retrieval queries run once, and LLM generation runs with bounded
+    concurrency. Results stream back as NDJSON, one line per question:
+    {"index", "id", "question", "agent", "answer", "sources"} (or "error"), in input order or,
+    with "order": "completed", as soon as each is ready.
     """
-    return run(req.question)
+    from core_ai.agent_system.batch import arun_batch
+
+    req = await _batch_request(request)
+    items = [q if isinstance(q, BatchItem) else BatchItem(question=q) for q in req.questions]
+    max_questions = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "5000"))
+    if len(items) > max_questions:
+        raise HTTPException(status_code=413, detail=f"At most {max_questions} questions per batch")
+    collection, tenant = _kb(req.collection, req.tenant)
 
+    async def lines():
+        start = time.perf_counter()
+        with use_kb(collection, tenant):
+            questions = [item.question for item in items]
+            async for i, result in arun_batch(questions, req.order == "input", req.llm_concurrency):
+                REQUESTS_TOTAL.inc(endpoint="/ask/batch", agent=result.get("agent", "error"))
+                yield json.dumps({"index": i, "id": items[i].id, "question": items[i].question, **result}) + "\n"
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint="/ask/batch")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest):
+    """
+    Server-Sent Events version of /ask:
+    "meta" (agent + sources) first, then "token" events as the LLM generates,
+    then "done" with the final {agent, answer, sources} (+ "timings" when debug is set).
+    """
+    from core_ai.agent_system.orchestrator import arun_stream
+
+    collection, tenant = _kb(req.collection, req.tenant)
+
+    async def events():
+        start = time.perf_counter()
+        with request_timings() as timings, use_kb(collection, tenant):
+            async for event in arun_stream(req.question):
+                name = event.pop("event")
+                if name == "done":
+                    elapsed = time.perf_counter() - start
+                    REQUEST_SECONDS.observe(elapsed, endpoint="/ask/stream")
+                    REQUESTS_TOTAL.inc(endpoint="/ask/stream", agent=event["agent"])
+                    if req.debug:
+                        event["timings"] = {**timings, "total": round(elapsed * 1000, 2)}
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
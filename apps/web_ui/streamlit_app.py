@@ -1,4 +1,6 @@
+import json
 import os
+import time
 from pathlib import Path
 
 import streamlit as st
@@ -30,6 +32,54 @@ with col_u1:
 with col_u2:
     ingest_after_save = st.checkbox("Ingest immediately after saving", value=True)
 
+def cancel_ingest(job_id):
+    requests.delete(f"{API_URL}/ingest/{job_id}", timeout=30)
+    st.toast(f"Cancellation requested for ingest job {job_id}")
+
+def run_ingest():
+    """
+    Starts a background ingest job and polls its status instead of blocking on one request.
+    """
+    r = requests.post(f"{API_URL}/ingest", timeout=30)
+    if r.status_code not in (202, 409):
+        st.error(f"Ingest failed: {r.status_code} - {r.text}")
+        return
+
+    job_id = r.json()["job_id"]
+    if r.status_code == 409:
+        st.info(f"An ingest is already running (job `{job_id}`); following it.")
+
+    # Clicking this interrupts the poll loop below; the callback runs on the next rerun
+    st.button("Cancel ingest", key=f"cancel_{job_id}", on_click=cancel_ingest, args=(job_id,))
+
+    progress = st.progress(0.0)
+    status_line = st.empty()
+    while True:
+        job = requests.get(f"{API_URL}/ingest/{job_id}", timeout=30).json()
+
+        total = job.get("files_total") or 0
+        done = job.get("files_processed") or 0
+        progress.progress(min(1.0, done / total) if total else 0.0)
+
+        eta = job.get("eta_s")
+        status_line.caption(
+            f"{job['status']}: {done}/{total} files, {job.get('chunks_embedded', 0)} chunks "
+            f"({job.get('chunks_per_s', 0)} chunks/s)"
+            + (f", ETA {eta:.0f}s" if eta is not None else "")
+        )
+
+        if job["status"] in ("completed", "cancelled", "failed"):
+            break
+        time.sleep(1)
+
+    if job["status"] == "completed":
+        progress.progress(1.0)
+        st.success(job.get("result"))
+    elif job["status"] == "cancelled":
+        st.warning(f"Ingest cancelled: {job.get('result')}")
+    else:
+        st.error(f"Ingest failed: {job.get('error')}")
+
 def save_uploads(files):
     RAW_DIR.mkdir(parents=True, exist_ok=True)
     saved = []
@@ -51,12 +101,7 @@ if save_clicked:
             st.write(f"✅ {p}")
 
         if ingest_after_save:
-            with st.spinner("Ingesting documents..."):
-                r = requests.post(f"{API_URL}/ingest", timeout=600)
-            if r.status_code == 200:
-                st.success(r.json())
-            else:
-                st.error(f"Ingest failed: {r.status_code} - {r.text}")
+            run_ingest()
 
 st.divider()
 
@@ -67,12 +112,7 @@ st.subheader("Ingest documents (manual)")
 col1, col2 = st.columns([1, 2])
 with col1:
     if st.button("Ingest Documents"):
-        with st.spinner("Ingesting..."):
-            r = requests.post(f"{API_URL}/ingest", timeout=600)
-        if r.status_code == 200:
-            st.success(r.json())
-        else:
-            st.error(f"Ingest failed: {r.status_code} - {r.text}")
+        run_ingest()
 with col2:
     st.caption("Uploads are saved into `data/raw_documents/` then indexed into Qdrant.")
 
@@ -84,6 +124,11 @@ st.divider()
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
+def source_label(s):
+    # "file › section" when the chunk carries a section title
+    file_ = s.get("file", "unknown")
+    return f"{file_} › {s['section']}" if s.get("section") else file_
+
 # Show previous messages
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
@@ -95,7 +140,7 @@ for msg in st.session_state.messages:
             st.markdown("**Sources:**")
             for s in msg["sources"]:
                 score = s.get("score", None)
-                file_ = s.get("file", "unknown")
+                file_ = source_label(s)
                 if score is None:
                     st.write(f"- {file_}")
                 else:
@@ -114,29 +159,54 @@ if prompt:
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
+        agent_slot = st.empty()
+        answer_slot = st.empty()
+        final = None
+        error = None
+
+        # Stream over SSE: "meta" (agent + sources), "token"..., then "done" (final result)
         with st.spinner("Thinking..."):
             resp = requests.post(
-                f"{API_URL}/ask",
+                f"{API_URL}/ask/stream",
                 json={"question": prompt, "top_k": 2},
+                stream=True,
                 timeout=600,
             )
 
         if resp.status_code != 200:
-            st.error(f"API error: {resp.status_code} - {resp.text}")
+            error = f"API error: {resp.status_code} - {resp.text}"
+        else:
+            event_name = None
+            streamed = ""
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event_name = line[len("event: "):]
+                elif line.startswith("data: "):
+                    payload = json.loads(line[len("data: "):])
+                    if event_name == "meta":
+                        agent_slot.markdown(f"🧠 **Agent:** `{payload.get('agent', 'unknown')}`")
+                    elif event_name == "token":
+                        streamed += payload.get("text", "")
+                        answer_slot.markdown(streamed + "▌")
+                    elif event_name == "done":
+                        final = payload
+
+        if error or final is None:
+            st.error(error or "API error: stream ended without a result")
         else:
-            data = resp.json()
-            agent = data.get("agent", "unknown")
-            answer = data.get("answer", "")
-            sources = data.get("sources", [])
+            agent = final.get("agent", "unknown")
+            answer = final.get("answer", "")
+            sources = final.get("sources", [])
 
-            st.markdown(f"🧠 **Agent:** `{agent}`")
-            st.markdown(answer)
+            # "done" is authoritative (the confidence gate may have swapped in the clarifier)
+            agent_slot.markdown(f"🧠 **Agent:** `{agent}`")
+            answer_slot.markdown(answer)
 
             if sources:
                 st.markdown("**Sources:**")
                 for s in sources:
                     score = s.get("score", None)
-                    file_ = s.get("file", "unknown")
+                    file_ = source_label(s)
                     if score is None:
                         st.write(f"- {file_}")
                     else:
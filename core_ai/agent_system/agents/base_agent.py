@@ -1,5 +1,42 @@
+import asyncio
+from typing import AsyncIterator, Iterator, Optional
+
+
 class BaseAgent:
     name = "base"
 
     def run(self, question: str) -> dict:
         raise NotImplementedError
+
+    def fetch(self, question: str) -> Optional[dict]:
+        """
+        Retrieval phase (no LLM call). None means the agent does not use the knowledge base.
+        """
+        return None
+
+    def generate(self, question: str, retrieval: Optional[dict]) -> str:
+        """
+        Generation phase over a fetch() result.
+        """
+        return "".join(self.stream(question, retrieval))
+
+    def stream(self, question: str, retrieval: Optional[dict]) -> Iterator[str]:
+        """
+        Generation phase used by streaming. Non-RAG agents yield their whole answer at once.
+        """
+        yield (self.run(question) or {}).get("answer", "")
+
+    # Async variants. Defaults run the sync phase in a worker thread; RAG agents override
+    # them with native async retrieval/generation.
+
+    async def arun(self, question: str) -> dict:
+        return await asyncio.to_thread(self.run, question)
+
+    async def afetch(self, question: str) -> Optional[dict]:
+        return None
+
+    async def agenerate(self, question: str, retrieval: Optional[dict]) -> str:
+        return await asyncio.to_thread(self.generate, question, retrieval)
+
+    async def astream(self, question: str, retrieval: Optional[dict]) -> AsyncIterator[str]:
+        yield await self.agenerate(question, retrieval)
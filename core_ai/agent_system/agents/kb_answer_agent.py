@@ -1,4 +1,5 @@
 from core_ai.agent_system.agents.base_agent import BaseAgent
+from core_ai.agent_system.tools import retrieve_tool
 from core_ai.agent_system.tools.retrieve_tool import retrieve
 
 class KBAnswerAgent(BaseAgent):
@@ -6,3 +7,24 @@ class KBAnswerAgent(BaseAgent):
 
     def run(self, question: str) -> dict:
         return retrieve(question, top_k=2)
+
+    def fetch(self, question: str) -> dict:
+        return retrieve_tool.fetch(question, top_k=2)
+
+    def generate(self, question: str, retrieval: dict) -> str:
+        return retrieve_tool.generate(retrieval, question, self.name)
+
+    def stream(self, question: str, retrieval: dict):
+        return retrieve_tool.stream(retrieval, question, self.name)
+
+    async def arun(self, question: str) -> dict:
+        return await retrieve_tool.aretrieve(question, top_k=2)
+
+    async def afetch(self, question: str) -> dict:
+        return await retrieve_tool.afetch(question, top_k=2)
+
+    async def agenerate(self, question: str, retrieval: dict) -> str:
+        return await retrieve_tool.agenerate(retrieval, question, self.name)
+
+    def astream(self, question: str, retrieval: dict):
+        return retrieve_tool.astream(retrieval, question, self.name)
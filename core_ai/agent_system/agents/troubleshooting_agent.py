@@ -1,19 +1,56 @@
+import os
+
 from core_ai.agent_system.agents.base_agent import BaseAgent
+from core_ai.agent_system.router import get_topic_router
+from core_ai.agent_system.tools import retrieve_tool
 from core_ai.agent_system.tools.retrieve_tool import retrieve
+from core_ai.rag_pipeline.retrieval.ask import embed_query
 
 
 class TroubleshootingAgent(BaseAgent):
     name = "troubleshooting"
 
-    def run(self, question: str) -> dict:
+    def _query(self, question: str) -> str:
         q = question.lower()
 
         # Keep retrieval queries short + intent-only (best for embeddings)
         if "vpn" in q and any(k in q for k in ["not connecting", "can't connect", "cannot connect", "fails", "failed"]):
-            return retrieve("vpn not connecting troubleshooting steps", top_k=2)
+            return "vpn not connecting troubleshooting steps"
 
         if "wifi" in q or "wi-fi" in q:
-            return retrieve("wifi troubleshooting steps", top_k=2)
+            return "wifi troubleshooting steps"
+
+        # Topic centroids; the orchestrator already embedded this question, so this is a cache hit
+        if os.getenv("ROUTER_MODE", "embedding").lower() == "embedding":
+            topic, score = get_topic_router().route(embed_query(question))
+            if topic and score >= float(os.getenv("ROUTER_TOPIC_MIN_SCORE", "0.5")):
+                return topic
 
         # Default to raw question
-        return retrieve(question, top_k=2)
+        return question
+
+    def run(self, question: str) -> dict:
+        return retrieve(question, top_k=2, template=self.name, query=self._query(question))
+
+    def fetch(self, question: str) -> dict:
+        return retrieve_tool.fetch(self._query(question), top_k=2)
+
+    def generate(self, question: str, retrieval: dict) -> str:
+        return retrieve_tool.generate(retrieval, question, self.name)
+
+    def stream(self, question: str, retrieval: dict):
+        return retrieve_tool.stream(retrieval, question, self.name)
+
+    async def arun(self, question: str) -> dict:
+        return await retrieve_tool.aretrieve(
+            question, top_k=2, template=self.name, query=self._query(question)
+        )
+
+    async def afetch(self, question: str) -> dict:
+        return await retrieve_tool.afetch(self._query(question), top_k=2)
+
+    async def agenerate(self, question: str, retrieval: dict) -> str:
+        return await retrieve_tool.agenerate(retrieval, question, self.name)
+
+    def astream(self, question: str, retrieval: dict):
+        return retrieve_tool.astream(retrieval, question, self.name)
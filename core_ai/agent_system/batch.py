@@ -0,0 +1,101 @@
+# core_ai/agent_system/batch.py
+"""
+Bulk question answering (POST /ask/batch, ticket triage, nightly evaluations).
+
+Every question still goes through orchestrator.arun() (FAQ, routing, gates, generation), but
+the batch shares the expensive parts:
+- all question embeddings are computed up front in one model call (routing, FAQ lookups and
+  retrieval then hit the query-embedding cache)
+- searches of questions in flight together are coalesced by the search micro-batcher
+- identical questions, and identical rewritten retrieval queries, run once (ask.batch_scope)
+- LLM generation runs with bounded concurrency
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence, Tuple
+
+from core_ai.agent_system.orchestrator import arun
+from core_ai.rag_pipeline.retrieval.ask import batch_scope, embed_queries
+
+
+async def _answer(question: str) -> Dict[str, Any]:
+    # One bad question must not fail the whole batch
+    try:
+        return await arun(question)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+async def arun_batch(
+    questions: Sequence[str],
+    ordered: bool = True,
+    llm_concurrency: Optional[int] = None,
+    window: Optional[int] = None,
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yields (input index, result) for every question: in input order, or as soon as each one
+    completes when ordered=False. A result is arun()'s {agent, answer, sources} or {"error"}.
+
+    At most `window` questions (ASK_BATCH_WINDOW, default 64) are in flight or waiting to be
+    yielded, so very large batches do not start thousands of pipelines at once; at most
+    `llm_concurrency` of them are generating (capped at ASK_BATCH_LLM_CONCURRENCY, default 4).
+    Finished results are kept until the end of the batch to answer repeated questions; closing
+    the generator early (client disconnect) cancels the questions still in flight.
+    """
+    # A request may lower the generation concurrency, never raise it past the server's limit
+    limit = max(1, int(os.getenv("ASK_BATCH_LLM_CONCURRENCY", "4")))
+    llm_concurrency = min(max(1, llm_concurrency), limit) if llm_concurrency else limit
+    window = max(1, window or int(os.getenv("ASK_BATCH_WINDOW", "64")))
+
+    with batch_scope(llm_concurrency):
+        tasks: Dict[str, asyncio.Task] = {}
+        try:
+            unique = list(dict.fromkeys((q or "").strip() for q in questions))
+            await asyncio.to_thread(embed_queries, unique)
+
+            def task_for(question: str) -> asyncio.Task:
+                key = (question or "").strip()
+                if key not in tasks:
+                    tasks[key] = asyncio.ensure_future(_answer(question))
+                return tasks[key]
+
+            if ordered:
+                queue: Deque[Tuple[int, asyncio.Task]] = deque()
+                for i, question in enumerate(questions):
+                    queue.append((i, task_for(question)))
+                    # Emit the finished head right away; block on it only when the window is full
+                    while queue and (len(queue) >= window or queue[0][1].done()):
+                        j, task = queue.popleft()
+                        yield j, await task
+                while queue:
+                    j, task = queue.popleft()
+                    yield j, await task
+                return
+
+            in_flight: Dict[asyncio.Task, List[int]] = {}
+            for i, question in enumerate(questions):
+                task = task_for(question)
+                if task.done():
+                    yield i, task.result()
+                    continue
+                in_flight.setdefault(task, []).append(i)
+                while len(in_flight) >= window:
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for finished in done:
+                        for j in in_flight.pop(finished):
+                            yield j, finished.result()
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    for j in in_flight.pop(finished):
+                        yield j, finished.result()
+        finally:
+            # Client disconnected or the consumer stopped early: stop answering for nobody
+            unfinished = [task for task in tasks.values() if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                await asyncio.gather(*unfinished, return_exceptions=True)
@@ -0,0 +1,99 @@
+# core_ai/agent_system/faq_builder.py
+"""
+Offline FAQ job: answers frequent questions through the full pipeline once and stores them
+(with their source chunk IDs) in the FAQ store, so orchestrator.run() can serve them without
+retrieval or an LLM call.
+
+    python -m core_ai.agent_system.faq_builder            # curated questions + existing entries
+    python -m core_ai.agent_system.faq_builder --stale    # entries invalidated by ingestion + missing seeds
+    python -m core_ai.agent_system.faq_builder --collection hr_kb [--tenant acme]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core_ai.agent_system.orchestrator import answer_with_chunks
+from core_ai.rag_pipeline.indexing.manifest import get_manifest_path, load_manifest
+from core_ai.rag_pipeline.indexing.tenancy import use_kb
+from core_ai.rag_pipeline.retrieval.ask import embed_query
+from core_ai.rag_pipeline.retrieval.faq import faq_enabled, get_faq_store
+
+
+def seed_questions() -> List[str]:
+    """
+    Curated questions (FAQ_QUESTIONS_FILE, one per line; unset or missing = none). The regression
+    questions are deliberately not seeds: /ask would answer them from the store, and the eval
+    would measure FAQ recall instead of routing, retrieval and generation.
+    """
+    curated = os.getenv("FAQ_QUESTIONS_FILE")
+    if not curated or not Path(curated).exists():
+        return []
+    lines = Path(curated).read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def index_version() -> str:
+    """Chunking signature + ingest generation of the current knowledge base's manifest."""
+    manifest = load_manifest(get_manifest_path())
+    return f"{manifest.get('chunking', '')}:{manifest.get('generation', 0)}"
+
+
+def build_faq(questions: Optional[List[str]] = None, stale_only: bool = False) -> Dict[str, int]:
+    """
+    (Re)generate FAQ entries. Only grounded answers are stored: questions that end at the
+    clarifier, or whose answer did not come from retrieved chunks, are dropped from the store
+    and recorded as misses at the current index version.
+    stale_only: entries invalidated by ingestion, plus seed questions that have no entry yet,
+    except those that already missed at this index version (nothing changed that could
+    make them answerable).
+    """
+    store = get_faq_store()
+    version = index_version()
+    if stale_only:
+        missing = [q for q in seed_questions() if q not in store and not store.missed(q, version)]
+        questions = store.questions(stale_only=True) + missing
+    elif questions is None:
+        questions = seed_questions() + store.questions()
+
+    stored = dropped = 0
+    for question in dict.fromkeys(questions):
+        result, chunk_ids = answer_with_chunks(question)
+        if chunk_ids:
+            store.put(question, result, chunk_ids, embed_query(question))
+            stored += 1
+        else:
+            store.remove(question)
+            store.mark_missed(question, version)
+            dropped += 1
+
+    if stored or dropped:
+        store.save()
+    return {"stored": stored, "dropped": dropped}
+
+
+def refresh_faq() -> Dict[str, int]:
+    """
+    Regenerate entries whose source chunks changed and build the seed questions missing from
+    the store that were not already tried at this index version (run after every ingest). Nothing to do with FAQ_ENABLED=false.
+    """
+    if not faq_enabled():
+        return {"stored": 0, "dropped": 0}
+    return build_faq(stale_only=True)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Precompute answers for frequent questions")
+    p.add_argument("--stale", action="store_true", help="only entries invalidated by ingestion and seed questions not stored yet")
+    p.add_argument("--collection", default=None, help="knowledge base (default: QDRANT_COLLECTION)")
+    p.add_argument("--tenant", default=None)
+    args = p.parse_args()
+    with use_kb(args.collection, args.tenant):
+        print(json.dumps(build_faq(stale_only=args.stale)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
 # core_ai/agent_system/orchestrator.py
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional
+import os
+from typing import Dict, Any, AsyncIterator, Iterator, FrozenSet, List, Optional, Sequence, Tuple
 
 from core_ai.agent_system.agents.kb_answer_agent import KBAnswerAgent
 from core_ai.agent_system.agents.troubleshooting_agent import TroubleshootingAgent
 from core_ai.agent_system.agents.ticket_writer_agent import TicketWriterAgent
 from core_ai.agent_system.agents.clarifier_agent import ClarifierAgent
+from core_ai.agent_system.router import get_agent_router
+from core_ai.observability.metrics import FAQ_LOOKUPS_TOTAL, stage
+from core_ai.rag_pipeline.retrieval.ask import aembed_query, embed_query
+from core_ai.rag_pipeline.retrieval.faq import faq_enabled, get_faq_store
+from core_ai.rag_pipeline.retrieval.relevance import covers, get_topic_store, question_terms, snippet_terms
 
 
 kb_agent = KBAnswerAgent()
@@ -14,31 +20,25 @@ troubleshoot_agent = TroubleshootingAgent()
 ticket_agent = TicketWriterAgent()
 clarifier_agent = ClarifierAgent()
 
-MIN_SOURCE_SCORE = 0.20
+AGENTS = {a.name: a for a in (kb_agent, troubleshoot_agent, ticket_agent, clarifier_agent)}
 
-STOPWORDS = {
-    "company", "policy", "process", "steps", "step", "please", "help",
-    "how", "what", "why", "when", "where", "which", "tell", "explain",
-    "guide", "details", "procedure", "info", "information",
-    "apply", "request", "create", "new", "issue", "problem",
-}
-
-# Topic keywords per file (keep these specific; avoid broad words like "annual")
-FILE_TOPIC_KEYWORDS: Dict[str, List[str]] = {
-    "hr_leave_policy.txt": ["leave", "holiday", "workday", "time off", "annual leave"],
-    "it_hardware_request.txt": ["laptop", "monitor", "hardware", "itsm", "service portal", "hardware request"],
-    "it_onboarding.txt": ["onboarding", "new employee", "starter", "join", "setup"],
-    "wifi_troubleshooting.txt": ["wifi", "wi-fi", "wireless", "router", "ssid", "internet"],
-    "vpn_runbook.txt": ["vpn", "client", "dns", "connect", "connection"],
-    "vpn_installation.txt": ["vpn", "install", "installation", "setup", "configure"],
-    "vpn_common_errors.txt": ["vpn", "error", "code", "691", "auth", "authentication"],
-    "account_password_reset.txt": ["password", "reset", "forgot", "mfa", "otp", "login"],
-}
+MIN_SOURCE_SCORE = 0.20
 
 VPN_TROUBLESHOOT_HINTS = ["not connecting", "can't connect", "cannot connect", "disconnect", "timeout"]
 
 
-def choose_agent(question: str):
+def embedding_routing() -> bool:
+    return os.getenv("ROUTER_MODE", "embedding").lower() == "embedding"
+
+
+@stage("route")
+def choose_agent(question: str, embedding: Optional[Sequence[float]] = None):
+    """
+    Explicit keyword rules act as overrides; everything else is routed by comparing the
+    question embedding to per-agent centroids (router.py). Questions that are not close to
+    any agent (ROUTER_MIN_SCORE) go to the clarifier. Without an embedding, or with
+    ROUTER_MODE=keyword, the keyword chain decides alone.
+    """
     q = (question or "").lower()
 
     if any(k in q for k in ["ticket", "jira", "itsm", "servicenow", "service now"]):
@@ -47,10 +47,64 @@ def choose_agent(question: str):
     if "vpn" in q and any(k in q for k in VPN_TROUBLESHOOT_HINTS + ["fails", "failed", "stuck"]):
         return troubleshoot_agent
 
-    if any(k in q for k in ["troubleshoot", "not working", "error", "issue", "problem"]):
-        return troubleshoot_agent
+    if embedding is None or not embedding_routing():
+        if any(k in q for k in ["troubleshoot", "not working", "error", "issue", "problem"]):
+            return troubleshoot_agent
+        return kb_agent
+
+    label, score = get_agent_router().route(embedding)
+    if score < float(os.getenv("ROUTER_MIN_SCORE", "0.2")):
+        return clarifier_agent
+    return AGENTS[label]
+
+
+def _route(question: str):
+    # The question embedding lands in the query-embedding cache, so retrieval reuses it
+    return choose_agent(question, embed_query(question) if embedding_routing() else None)
+
+
+async def _aroute(question: str):
+    return choose_agent(question, await aembed_query(question) if embedding_routing() else None)
+
+
+def _faq_active() -> bool:
+    return faq_enabled() and len(get_faq_store()) > 0
+
 
-    return kb_agent
+def _faq_result(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {"agent": entry["agent"], "answer": entry["answer"], "sources": entry["sources"]}
+
+
+@stage("faq")
+def _faq_exact(question: str) -> Optional[Dict[str, Any]]:
+    entry = get_faq_store().lookup_exact(question)
+    if entry is None:
+        return None
+    FAQ_LOOKUPS_TOTAL.inc(outcome="exact")
+    return _faq_result(entry)
+
+
+@stage("faq")
+def _faq_similar(embedding: Sequence[float]) -> Optional[Dict[str, Any]]:
+    entry = get_faq_store().lookup_similar(embedding, float(os.getenv("FAQ_MIN_SIMILARITY", "0.92")))
+    FAQ_LOOKUPS_TOTAL.inc(outcome="similar" if entry else "miss")
+    return _faq_result(entry) if entry else None
+
+
+def _faq(question: str) -> Optional[Dict[str, Any]]:
+    """
+    Precomputed answer for a known question: exact (normalized) match first, then the nearest
+    FAQ question by embedding. The embedding is cached, so routing reuses it on a miss.
+    """
+    if not _faq_active():
+        return None
+    return _faq_exact(question) or _faq_similar(embed_query(question))
+
+
+async def _afaq(question: str) -> Optional[Dict[str, Any]]:
+    if not _faq_active():
+        return None
+    return _faq_exact(question) or _faq_similar(await aembed_query(question))
 
 
 def _normalize_sources(sources: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
@@ -60,13 +114,16 @@ def _normalize_sources(sources: Optional[List[Dict[str, Any]]]) -> List[Dict[str
     for s in sources:
         if not isinstance(s, dict):
             continue
-        out.append(
-            {
-                "file": s.get("file", "unknown"),
-                "score": s.get("score", None),
-                "snippet": s.get("snippet", ""),
-            }
-        )
+        item = {
+            "file": s.get("file", "unknown"),
+            "score": s.get("score", None),
+            "snippet": s.get("snippet", ""),
+        }
+        # Citation extras precomputed at ingest (absent for older chunks and FAQ entries)
+        for key in ("section", "steps"):
+            if s.get(key):
+                item[key] = s[key]
+        out.append(item)
     return out
 
 
@@ -76,83 +133,220 @@ def _max_score(sources: List[Dict[str, Any]]) -> float:
     return max(numeric_scores) if numeric_scores else 0.0
 
 
-def _topic_match(question: str, top_file: str) -> bool:
-    """Return True if question contains expected topic keywords for that file."""
-    q = (question or "").lower()
-
-    # STRICT guard for HR annual leave policy (avoid matching maternity/paternity etc.)
-    if top_file == "hr_leave_policy.txt":
-        return (
-            "annual leave" in q
-            or "holiday" in q
-            or "time off" in q
-            or "workday" in q
-        )
-
-    keys = FILE_TOPIC_KEYWORDS.get(top_file, [])
-    if not keys:
-        return True
-    return any(k in q for k in keys)
-
-
-
-def low_confidence(question: str, result: Dict[str, Any]) -> bool:
-    answer = (result.get("answer") or "").lower()
-    sources = _normalize_sources(result.get("sources"))
+@stage("confidence")
+def low_confidence_sources(
+    question: str,
+    sources: List[Dict[str, Any]],
+    keywords: Optional[FrozenSet[str]] = None,
+) -> bool:
+    """
+    Pre-generation guards: everything that only needs the retrieved sources.
+    Runs before the LLM call so unanswerable questions never pay for generation.
+    keywords: the retrieved chunks' precomputed keyword sets (retrieval["keywords"]); when
+    missing, the terms of the source snippets are used instead.
+    Relevance checks are set operations on precomputed terms (relevance.py), so their cost does
+    not depend on snippet length or corpus size.
+    """
+    sources = _normalize_sources(sources)
 
     if not sources:
         return True
 
     q_lower = (question or "").lower()
 
-    # VPN troubleshooting: less strict
+    # VPN troubleshooting: less strict (only the answer check applies)
     if "vpn" in q_lower and any(k in q_lower for k in VPN_TROUBLESHOOT_HINTS):
-        if "not found in knowledge base" in answer:
-            return True
         return False
 
     if _max_score(sources) < MIN_SOURCE_SCORE:
         return True
 
-    if "not found in knowledge base" in answer:
-        return True
-
-    # File-topic relevance guard
-    top_file = sources[0].get("file", "unknown")
-    if not _topic_match(question, top_file):
+    # File-topic relevance guard: vocabularies learned per file at ingest
+    q_terms = question_terms(question)
+    if not get_topic_store().match(q_terms, sources[0].get("file", "unknown"), _max_score(sources)):
         return True
 
     # Semantic relevance guard (ignore generic words)
-    q_tokens = set(
-        w.strip(".,!?;:()[]{}'\"").lower()
-        for w in (question or "").split()
-        if len(w) > 3 and w.lower() not in STOPWORDS
-    )
-    combined_text = " ".join((s.get("snippet") or "").lower() for s in sources)
+    return not covers(q_terms, keywords if keywords is not None else snippet_terms(sources))
 
-    if q_tokens and not any(token in combined_text for token in q_tokens):
-        return True
 
-    return False
+@stage("confidence")
+def low_confidence_answer(answer: Optional[str]) -> bool:
+    """Post-generation guard: the LLM itself said the context was not enough."""
+    return "not found in knowledge base" in (answer or "").lower()
 
 
-def run(question: str) -> Dict[str, Any]:
-    agent = choose_agent(question)
-    result = agent.run(question) or {}
-    result["sources"] = _normalize_sources(result.get("sources"))
+def low_confidence(question: str, result: Dict[str, Any]) -> bool:
+    return low_confidence_sources(question, result.get("sources")) or low_confidence_answer(
+        result.get("answer")
+    )
 
-    if low_confidence(question, result):
-        clarified = clarifier_agent.run(question) or {}
-        clarified["agent"] = clarifier_agent.name
-        clarified["sources"] = _normalize_sources(clarified.get("sources"))
-        return {
-            "agent": clarified["agent"],
-            "answer": clarified.get("answer", ""),
-            "sources": clarified["sources"],
-        }
 
+def _clarify(question: str) -> Dict[str, Any]:
+    clarified = clarifier_agent.run(question) or {}
     return {
-        "agent": agent.name,
-        "answer": result.get("answer", ""),
-        "sources": result.get("sources", []),
+        "agent": clarifier_agent.name,
+        "answer": clarified.get("answer", ""),
+        "sources": _normalize_sources(clarified.get("sources")),
     }
+
+
+# (early, agent, retrieval, sources) from the pre-generation phase, see _prepare()
+Prepared = Tuple[Optional[Dict[str, Any]], Any, Optional[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+def _gate_sources(
+    question: str, retrieval: Optional[Dict[str, Any]]
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(clarifier result if the retrieved sources are not good enough, normalized sources)."""
+    if retrieval is None:
+        return None, []
+    sources = _normalize_sources(retrieval.get("sources"))
+    if low_confidence_sources(question, sources, retrieval.get("keywords")):
+        return _clarify(question), sources
+    return None, sources
+
+
+def _prepare(question: str, faq: bool = True) -> Prepared:
+    """
+    Everything before generation: FAQ lookup, routing, retrieval and the source gates.
+    early is the final result when no generation is needed (FAQ hit, or the clarifier after a
+    low-confidence retrieval); otherwise the agent generates from retrieval (None for agents
+    without a retrieval phase) and sources. Only the generate step differs between run(),
+    arun() and the streaming variants.
+    """
+    hit = _faq(question) if faq else None
+    if hit is not None:
+        return hit, None, None, hit["sources"]
+    agent = _route(question)
+    retrieval = agent.fetch(question)
+    early, sources = _gate_sources(question, retrieval)
+    return early, agent, retrieval, sources
+
+
+async def _aprepare(question: str) -> Prepared:
+    """Async _prepare(): the same phases, with embedding and retrieval awaited."""
+    hit = await _afaq(question)
+    if hit is not None:
+        return hit, None, None, hit["sources"]
+    agent = await _aroute(question)
+    retrieval = await agent.afetch(question)
+    early, sources = _gate_sources(question, retrieval)
+    return early, agent, retrieval, sources
+
+
+def _whole_result(question: str, agent: Any, result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Agent without a retrieval phase: it ran whole, so gate on its result
+    result = result or {}
+    result["sources"] = _normalize_sources(result.get("sources"))
+    if low_confidence(question, result):
+        return _clarify(question)
+    return {"agent": agent.name, "answer": result.get("answer", ""), "sources": result["sources"]}
+
+
+def _answer_result(
+    question: str, agent: Any, retrieval: Optional[Dict[str, Any]], answer: str, sources: List[Dict[str, Any]]
+) -> Optional[Dict[str, Any]]:
+    """Final result after generation, or None when the answer check trips (caller clarifies)."""
+    if retrieval is not None and low_confidence_answer(answer):
+        return None
+    return {"agent": agent.name, "answer": answer, "sources": sources}
+
+
+def _result_events(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # A result known before generation (FAQ hit, clarifier), streamed as a single token
+    return [
+        {"event": "meta", "agent": result["agent"], "sources": result["sources"]},
+        {"event": "token", "text": result["answer"]},
+        {"event": "done", **result},
+    ]
+
+
+def run(question: str) -> Dict[str, Any]:
+    """
+    Retrieval and generation are separate phases: source-based guards run between them,
+    so low-confidence questions go straight to the clarifier without an LLM call.
+    Known questions are answered from the precomputed FAQ store before any of that.
+    """
+    hit = _faq(question)
+    if hit is not None:
+        return hit
+    return answer_with_chunks(question)[0]
+
+
+def answer_with_chunks(question: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    run() without the FAQ lookup. Also returns the chunk IDs the answer was generated from
+    (empty when it was not grounded in retrieved chunks, e.g. the clarifier answered).
+    """
+    early, agent, retrieval, sources = _prepare(question, faq=False)
+    if early is not None:
+        return early, []
+    if retrieval is None:
+        return _whole_result(question, agent, agent.run(question)), []
+
+    result = _answer_result(question, agent, retrieval, agent.generate(question, retrieval), sources)
+    if result is None:
+        return _clarify(question), []
+    return result, list(retrieval.get("chunk_ids") or [])
+
+
+def run_stream(question: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of run(). Yields events:
+    - {"event": "meta", "agent", "sources"}   before any generation
+    - {"event": "token", "text"}              as the LLM produces them
+    - {"event": "done", "agent", "answer", "sources"}  final, authoritative result
+
+    Same gates as run(): source checks before generation; if the answer check trips
+    after streaming, "done" carries the clarifier answer instead. FAQ hits are yielded as
+    a single token.
+    """
+    early, agent, retrieval, sources = _prepare(question)
+    if early is not None:
+        yield from _result_events(early)
+        return
+
+    yield {"event": "meta", "agent": agent.name, "sources": sources}
+
+    parts: List[str] = []
+    for token in agent.stream(question, retrieval):
+        parts.append(token)
+        yield {"event": "token", "text": token}
+
+    result = _answer_result(question, agent, retrieval, "".join(parts), sources)
+    yield {"event": "done", **(result or _clarify(question))}
+
+
+async def arun(question: str) -> Dict[str, Any]:
+    """
+    Async run(): same phases and gates, but retrieval (AsyncQdrantClient) and generation
+    (async Ollama) are awaited, so an in-flight question doesn't hold a threadpool thread.
+    """
+    early, agent, retrieval, sources = await _aprepare(question)
+    if early is not None:
+        return early
+    if retrieval is None:
+        return _whole_result(question, agent, await agent.arun(question))
+
+    answer = await agent.agenerate(question, retrieval)
+    return _answer_result(question, agent, retrieval, answer, sources) or _clarify(question)
+
+
+async def arun_stream(question: str) -> AsyncIterator[Dict[str, Any]]:
+    """Async run_stream(); yields the same meta/token/done events."""
+    early, agent, retrieval, sources = await _aprepare(question)
+    if early is not None:
+        for event in _result_events(early):
+            yield event
+        return
+
+    yield {"event": "meta", "agent": agent.name, "sources": sources}
+
+    parts: List[str] = []
+    async for token in agent.astream(question, retrieval):
+        parts.append(token)
+        yield {"event": "token", "text": token}
+
+    result = _answer_result(question, agent, retrieval, "".join(parts), sources)
+    yield {"event": "done", **(result or _clarify(question))}
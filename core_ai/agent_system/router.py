@@ -0,0 +1,129 @@
+# core_ai/agent_system/router.py
+from __future__ import annotations
+
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core_ai.rag_pipeline.retrieval.ask import embed_texts
+
+
+# Seed utterances per agent. Each agent is represented by the centroid of its seeds' embeddings,
+# so a new intent means adding a few example questions here, not another substring rule.
+# Seeds are paraphrases: keep them out of evaluation/regression_tests/questions.json, or the
+# regression run measures recall of the seeds instead of routing.
+AGENT_EXAMPLES: Dict[str, List[str]] = {
+    "ticket_writer": [
+        "create a ticket for this issue",
+        "raise an IT support ticket",
+        "log an incident in the service desk",
+        "open a helpdesk request for my broken laptop",
+        "write a ticket describing the problem",
+        "file a support case with IT",
+    ],
+    "troubleshooting": [
+        "the vpn won't connect from home",
+        "my wifi keeps dropping",
+        "I get an error when I log in",
+        "what does this error code mean",
+        "what does vpn error 809 mean",
+        "the connection times out",
+        "something is not working, how do I fix it",
+        "the application crashes on startup",
+        "my laptop cannot reach the internet",
+        "troubleshoot a network problem",
+    ],
+    "kb_answer": [
+        "where do I download the remote access software",
+        "I forgot my login credentials, how do I change them",
+        "how many vacation days can I take and how do I book them",
+        "how do I order a second screen for my desk",
+        "what are the onboarding steps for new employees",
+        "what is the process for requesting hardware",
+        "where can I find the company policy",
+        "how do I set up my work account",
+    ],
+}
+
+# Troubleshooting topics -> short, intent-only retrieval query (best for embeddings).
+# The "" topic means "retrieve with the question as asked": specific lookups such as error codes
+# must keep their exact tokens instead of being rewritten to a generic runbook query.
+TOPIC_EXAMPLES: Dict[str, List[str]] = {
+    "": [
+        "what does error code 800 mean",
+        "vpn says error 812, what is that",
+        "explain this error message",
+        "the app shows error 0x80070005",
+    ],
+    "vpn not connecting troubleshooting steps": [
+        "vpn connection fails",
+        "the tunnel never comes up",
+        "cannot connect to the vpn",
+        "vpn keeps disconnecting",
+        "vpn client stuck on connecting",
+    ],
+    "wifi troubleshooting steps": [
+        "wireless network keeps dropping",
+        "laptop does not see the office network",
+        "cannot connect to wi-fi",
+        "no internet on the office wifi",
+        "router or ssid problems",
+    ],
+}
+
+
+class CentroidRouter:
+    """
+    Scores a query embedding against one centroid per label in a single matrix-vector product.
+    Centroids are built lazily from the seed utterances on first use (one batched embed call).
+    """
+
+    def __init__(self, examples: Dict[str, List[str]]):
+        self.examples = examples
+        self._labels: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _centroids(self) -> Tuple[List[str], np.ndarray]:
+        if self._matrix is None:
+            with self._lock:
+                if self._matrix is None:
+                    labels = list(self.examples)
+                    rows = []
+                    for label in labels:
+                        vecs = _normalize(np.asarray(embed_texts(self.examples[label]), dtype=np.float32))
+                        rows.append(vecs.mean(axis=0))
+                    self._labels = labels
+                    self._matrix = _normalize(np.vstack(rows))
+        return self._labels, self._matrix
+
+    def warm(self) -> None:
+        """Build the centroids now (startup warmup) instead of on the first routed question."""
+        self._centroids()
+
+    def scores(self, embedding: Sequence[float]) -> Dict[str, float]:
+        labels, matrix = self._centroids()
+        q = _normalize(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        return dict(zip(labels, (matrix @ q).tolist()))
+
+    def route(self, embedding: Sequence[float]) -> Tuple[str, float]:
+        """Best label and its cosine similarity to the query."""
+        scores = self.scores(embedding)
+        label = max(scores, key=scores.get)
+        return label, scores[label]
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-12)
+
+
+@lru_cache(maxsize=1)
+def get_agent_router() -> CentroidRouter:
+    return CentroidRouter(AGENT_EXAMPLES)
+
+
+@lru_cache(maxsize=1)
+def get_topic_router() -> CentroidRouter:
+    return CentroidRouter(TOPIC_EXAMPLES)
@@ -1,23 +1,83 @@
-from core_ai.rag_pipeline.retrieval.ask import ask_question
+from typing import AsyncIterator, Iterator, Optional
 
+from core_ai.rag_pipeline.retrieval.ask import (
+    aask_question,
+    agenerate_answer,
+    ask_question,
+    aretrieve_context,
+    astream_answer,
+    generate_answer,
+    retrieve_context,
+    stream_answer,
+)
 
-def retrieve(question: str, top_k: int = 2) -> dict:
+
+def retrieve(question: str, top_k: int = 2, template: str = "kb_answer", query: Optional[str] = None) -> dict:
     """
     Main RAG tool:
-    - retrieves relevant context from vector DB
-    - asks LLM using that context
+    - retrieves relevant context from vector DB (with `query`, default: the question)
+    - asks LLM using that context and the agent's prompt template
     Returns: {"answer": "...", "sources": [...]}
     """
 
     # IMPORTANT:
-    # Pass the raw user question to retrieval.
-    # Prompt formatting is handled inside ask_question().
+    # Pass the raw user question (or a short intent query) to retrieval.
+    # Task instructions belong to the prompt template, never to the retrieval query.
     result = ask_question(
         question=question,
         top_k=top_k,
+        template=template,
+        query=query,
     )
 
     return {
         "answer": result.get("answer", ""),
         "sources": result.get("sources", []),
     }
+
+
+def fetch(question: str, top_k: int = 2) -> dict:
+    """
+    Retrieval phase only (no LLM call). Pass the result to generate() or stream().
+    Returns: {"question": "...", "sources": [...], "chunk_ids": [...], "embedding": [...]}
+    """
+    return retrieve_context(question, top_k=top_k)
+
+
+def generate(retrieval: dict, question: Optional[str] = None, template: str = "kb_answer") -> str:
+    """
+    Generation phase for a fetch() result: one full LLM completion over its sources.
+    `question` is the user's question when retrieval used a rewritten query.
+    """
+    return generate_answer(retrieval, question, template)
+
+
+def stream(retrieval: dict, question: Optional[str] = None, template: str = "kb_answer") -> Iterator[str]:
+    """
+    Generation phase for a fetch() result, yielding answer tokens as the LLM produces them.
+    """
+    return stream_answer(retrieval, question, template)
+
+
+# Async variants (used by the async API path; Qdrant and Ollama calls don't hold a thread)
+
+async def aretrieve(
+    question: str, top_k: int = 2, template: str = "kb_answer", query: Optional[str] = None
+) -> dict:
+    result = await aask_question(question=question, top_k=top_k, template=template, query=query)
+    return {
+        "answer": result.get("answer", ""),
+        "sources": result.get("sources", []),
+    }
+
+
+async def afetch(question: str, top_k: int = 2) -> dict:
+    return await aretrieve_context(question, top_k=top_k)
+
+
+async def agenerate(retrieval: dict, question: Optional[str] = None, template: str = "kb_answer") -> str:
+    return await agenerate_answer(retrieval, question, template)
+
+
+def astream(retrieval: dict, question: Optional[str] = None, template: str = "kb_answer") -> AsyncIterator[str]:
+    return astream_answer(retrieval, question, template)
@@ -3,12 +3,8 @@ from core_ai.agent_system.tools.retrieve_tool import retrieve
 def summarise(question: str) -> dict:
     """
     Summarise relevant knowledge base content.
+    The summary instructions live in the "summarise" prompt template, so retrieval
+    only embeds the user's request.
     Returns: {"answer": "...", "sources": [...]}
     """
-    prompt = (
-        "Summarise the relevant knowledge base content in 5 bullet points.\n"
-        "Be accurate and do not invent information.\n\n"
-        f"User request: {question}"
-    )
-
-    return retrieve(prompt, top_k=3)
+    return retrieve(question, top_k=3, template="summarise")
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Seconds; covers sub-ms cache hits up to multi-second CPU LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[idx] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', repr(bound)))} {cumulative}")
+                cumulative += counts[-1]
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {cumulative}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {total[0]}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("ekc_stage_seconds", "Time spent per pipeline stage")
+REQUEST_SECONDS = Histogram("ekc_request_seconds", "End-to-end request latency")
+REQUESTS_TOTAL = Counter("ekc_requests_total", "Answered requests by endpoint and final agent")
+INGEST_DOCUMENTS_TOTAL = Counter("ekc_ingest_documents_total", "Documents parsed by ingestion")
+INGEST_CHUNKS_TOTAL = Counter("ekc_ingest_chunks_total", "Chunks embedded and upserted by ingestion")
+INGEST_FILES_TOTAL = Counter("ekc_ingest_files_total", "Files seen by ingestion, by outcome")
+FAQ_LOOKUPS_TOTAL = Counter("ekc_faq_lookups_total", "FAQ store lookups by outcome (exact, similar, miss)")
+BATCH_SIZE = Histogram(
+    "ekc_batch_size", "Requests coalesced per micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+_REGISTRY = [
+    REQUEST_SECONDS,
+    STAGE_SECONDS,
+    REQUESTS_TOTAL,
+    INGEST_DOCUMENTS_TOTAL,
+    INGEST_CHUNKS_TOTAL,
+    INGEST_FILES_TOTAL,
+    FAQ_LOOKUPS_TOTAL,
+    BATCH_SIZE,
+]
+
+# Per-request stage timings (ms); set by request_timings(), filled by stage()
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("ekc_timings", default=None)
+
+
+@contextmanager
+def request_timings() -> Iterator[Dict[str, float]]:
+    """
+    Collect stage timings for one request. The dict is shared with asyncio tasks and
+    asyncio.to_thread() workers started inside the block (they copy the context).
+    """
+    timings: Dict[str, float] = {}
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def record_stage(stage: str, seconds: float, pipeline: str = "ask") -> None:
+    STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds * 1000, 2)
+
+
+@contextmanager
+def stage(name: str, pipeline: str = "ask") -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start, pipeline)
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,12 +1,24 @@
 import os
+from functools import lru_cache
+
 from llama_index.llms.ollama import Ollama
 from llama_index.core.llms.mock import MockLLM
 
+@lru_cache(maxsize=1)
 def get_llm():
+    """
+    Shared LLM client: the Ollama wrapper keeps its sync/async HTTP clients (and their
+    connection pools) for the life of the process instead of rebuilding them per request.
+    """
     if os.getenv("MOCK_LLM", "false").lower() == "true":
         return MockLLM()
 
     return Ollama(
         model=os.getenv("OLLAMA_MODEL", "gemma3:1b"),
+        base_url=os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
         request_timeout=120,
+        # num_ctx; the context packer budgets retrieved text against the same window
+        context_window=int(os.getenv("OLLAMA_CONTEXT_WINDOW", "4096")),
+        # Keep the model (and the KV cache of the shared prompt prefix) loaded between requests
+        keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
     )
@@ -0,0 +1,69 @@
+from typing import Dict
+
+
+# Identical for every request and every agent, and always first: Ollama (llama.cpp) reuses the
+# KV cache for the longest prompt prefix it has already processed, so on a warm model
+# (OLLAMA_KEEP_ALIVE) these tokens are not prefilled again.
+SYSTEM_PREFIX = (
+    "You are an enterprise knowledge assistant.\n"
+    "Use ONLY the context provided after the instructions.\n"
+    "If the context is not enough, say: 'Not found in knowledge base' and ask ONE clarifying question.\n"
+    "Do not invent information that is not in the context.\n\n"
+)
+
+_STEPS_FORMAT = (
+    "Rules:\n"
+    "- Extract steps ONLY from the context. Do not invent new steps.\n"
+    "- If the context lists multiple items, include ALL of them.\n"
+    "- Keep each step to one line.\n\n"
+    "Output format (MUST follow):\n"
+    "Summary: <one sentence>\n"
+    "Steps:\n"
+    "- <step 1>\n"
+    "- <step 2>\n"
+    "- <step 3>\n"
+    "- <step N>\n"
+    "Done.\n\n"
+    "Formatting rules:\n"
+    "- Each step MUST start with '- '.\n\n"
+)
+
+# Per-agent task instructions: static per template, so they extend the reusable prefix
+TEMPLATES: Dict[str, str] = {
+    "kb_answer": (
+        "Task: answer the user's question from the knowledge base.\n"
+        + _STEPS_FORMAT
+    ),
+    "troubleshooting": (
+        "Task: give troubleshooting steps for the user's problem, in the order they should be tried.\n"
+        + _STEPS_FORMAT
+    ),
+    "ticket_writer": (
+        "Task: create an ITSM ticket summary for the user's request.\n"
+        "If context is missing, state what is missing.\n\n"
+        "Format exactly:\n"
+        "Title:\n"
+        "Impact:\n"
+        "Symptoms:\n"
+        "Likely Cause:\n"
+        "Suggested Next Steps:\n"
+        "References:\n\n"
+    ),
+    "summarise": (
+        "Task: summarise the relevant knowledge base content in 5 bullet points.\n"
+        "Be accurate and do not invent information.\n\n"
+    ),
+}
+
+
+def render_prompt(template: str, question: str, context: str) -> str:
+    """
+    Static part first (system prefix + agent instructions), variable part last
+    (retrieved context, then the user's question).
+    """
+    instructions = TEMPLATES.get(template, TEMPLATES["kb_answer"])
+    return (
+        f"{SYSTEM_PREFIX}{instructions}"
+        f"Context:\n{context}\n\n"
+        f"User question: {question}\n"
+    )
@@ -1,11 +1,138 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
 from llama_index.core import Settings
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+
+DEFAULT_EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# EMBED_BACKEND -> (sentence-transformers backend, default export file inside the model repo).
+# The int8 variants are the dynamically quantized exports sentence-transformers publishes next
+# to the fp32 ONNX/OpenVINO files (all-MiniLM-L6-v2 ships them on the Hub); they give the same
+# vectors up to quantization error, so an existing collection does not need re-embedding to try them.
+BACKENDS: Dict[str, Tuple[str, Optional[str]]] = {
+    "torch": ("torch", None),
+    "onnx": ("onnx", None),
+    "onnx-int8": ("onnx", "onnx/model_quint8_avx2.onnx"),
+    "openvino": ("openvino", None),
+    "openvino-int8": ("openvino", "openvino/openvino_model_qint8_quantized.xml"),
+}
+
+
+def _thread_kwargs(backend: str, threads: int) -> Dict[str, Any]:
+    """Per-backend intra-op thread setting (model_kwargs for sentence-transformers)."""
+    if backend == "onnx":
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        return {"session_options": options}
+    if backend == "openvino":
+        return {"ov_config": {"INFERENCE_NUM_THREADS": str(threads)}}
+
+    import torch
+
+    torch.set_num_threads(threads)  # process-wide for PyTorch
+    return {}
+
+
+def load_embed_model(
+    backend: str = "torch",
+    model_name: Optional[str] = None,
+    file_name: Optional[str] = None,
+    threads: Optional[int] = None,
+    batch_size: Optional[int] = None,
+):
+    """
+    Build an embedding model for one backend (see BACKENDS). Used by get_embed_model() and by
+    evaluation/embed_benchmark.py to compare backends side by side.
+    model_name is a Hugging Face model ID or a local directory (e.g. a pre-downloaded or
+    exported copy baked into the image, so containers start without a download).
+    """
+    # Imported here: torch + sentence-transformers take seconds to import
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBED_BACKEND {backend!r} (expected one of {', '.join(BACKENDS)})")
+    st_backend, default_file = BACKENDS[backend]
+
+    model_kwargs: Dict[str, Any] = {}
+    if file_name or default_file:
+        model_kwargs["file_name"] = file_name or default_file
+    if threads:
+        model_kwargs.update(_thread_kwargs(st_backend, threads))
+
+    kwargs: Dict[str, Any] = {}
+    if st_backend != "torch":
+        kwargs["backend"] = st_backend
+    if model_kwargs:
+        kwargs["model_kwargs"] = model_kwargs
+
+    return HuggingFaceEmbedding(
+        model_name=model_name or DEFAULT_EMBED_MODEL,
+        embed_batch_size=batch_size or 64,
+        cache_folder=os.getenv("EMBED_CACHE_DIR") or None,
+        **kwargs,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embed_model():
+    """
+    Process-wide embedding model, loaded once (ingestion, retrieval, routing and warmup all
+    share it).
+    EMBED_BACKEND: torch | onnx | onnx-int8 | openvino | openvino-int8
+    EMBED_MODEL / EMBED_MODEL_FILE: model ID or local directory, and a specific export inside it.
+    EMBED_THREADS: intra-op threads (default: the runtime's own choice).
+    EMBED_BATCH_SIZE controls how many chunks go through the model per forward pass.
+    """
+    threads = os.getenv("EMBED_THREADS")
+    return load_embed_model(
+        backend=os.getenv("EMBED_BACKEND", "torch").lower(),
+        model_name=os.getenv("EMBED_MODEL", DEFAULT_EMBED_MODEL),
+        file_name=os.getenv("EMBED_MODEL_FILE") or None,
+        threads=int(threads) if threads else None,
+        batch_size=int(os.getenv("EMBED_BATCH_SIZE", "64")),
+    )
+
+
+def _query_prefix(model) -> Optional[str]:
+    """
+    Text that, prepended to a query, makes its text embedding equal to its query embedding:
+    sentence-transformers applies the "query"/"text" prompts as plain prefixes. None when that
+    cannot be established (another embedding class, or a model with a document instruction too).
+    """
+    try:
+        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+        from llama_index.embeddings.huggingface.utils import (
+            get_query_instruct_for_model_name,
+            get_text_instruct_for_model_name,
+        )
+    except ImportError:
+        return None
+    if not isinstance(model, HuggingFaceEmbedding):
+        return None
+    if model.text_instruction or get_text_instruct_for_model_name(model.model_name):
+        return None
+    return model.query_instruction or get_query_instruct_for_model_name(model.model_name)
+
+
+def get_query_embedding_batch(queries: List[str]) -> List[List[float]]:
+    """
+    Query embeddings for many queries, in batched forward passes where the model allows it
+    (the query prompt is folded into the text, then get_text_embedding_batch()); otherwise one
+    get_query_embedding() per query.
+    """
+    model = get_embed_model()
+    prefix = _query_prefix(model)
+    if prefix is None:
+        return [model.get_query_embedding(q) for q in queries]
+    return model.get_text_embedding_batch([prefix + q for q in queries])
 
 
 def setup_local_embeddings() -> None:
     """
     Local embeddings (no OpenAI key needed).
     """
-    Settings.embed_model = HuggingFaceEmbedding(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    Settings.embed_model = get_embed_model()
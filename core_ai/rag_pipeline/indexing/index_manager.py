@@ -1,21 +1,57 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Any, Dict, List
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
-from llama_index.core import StorageContext, VectorStoreIndex
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
 
+from core_ai.observability.metrics import INGEST_FILES_TOTAL
 from core_ai.rag_pipeline.indexing.embeddings import setup_local_embeddings
-from core_ai.rag_pipeline.indexing.vector_store import get_vector_store
+from core_ai.rag_pipeline.indexing.manifest import (
+    collection_state_dir,
+    get_manifest_path,
+    kb_object,
+    keep_kb_object,
+    load_manifest,
+    plan_changes,
+    save_manifest,
+    stale_chunk_ids,
+)
+from core_ai.rag_pipeline.indexing.pipeline import run_pipeline
+from core_ai.rag_pipeline.indexing.sparse_index import get_sparse_index
+from core_ai.rag_pipeline.indexing.tenancy import current_collection, current_tenant
+from core_ai.rag_pipeline.indexing.vector_store import get_vector_store, has_points
+from core_ai.rag_pipeline.ingestion.chunking import (
+    chunk_overlap,
+    chunk_size,
+    chunking_mode,
+    chunking_signature,
+    get_structured_splitter,
+)
+from core_ai.rag_pipeline.retrieval.cache import on_index_changed
+from core_ai.rag_pipeline.retrieval.faq import get_faq_store
+from core_ai.rag_pipeline.retrieval.relevance import get_topic_store
 
 
-@lru_cache(maxsize=1)
-def get_index() -> VectorStoreIndex:
+def get_index(collection: Optional[str] = None) -> VectorStoreIndex:
+    """
+    Index handle for a collection (default: the current knowledge base, see tenancy.use_kb).
+    Handles live with the rest of the per-KB state in a bounded LRU (manifest.kb_object,
+    INDEX_CACHE_SIZE); they are cheap to rebuild because they all share the embedding model and
+    the pooled Qdrant client. Tenants of a shared collection share its handle and are separated
+    by a metadata filter at search time.
+    """
+    collection = collection or current_collection()
+    return kb_object(collection_state_dir(collection), "index", lambda: _index(collection))
+
+
+def _index(collection: str) -> VectorStoreIndex:
     # Always use local embeddings (simple + works on your laptop)
     setup_local_embeddings()
 
-    vector_store = get_vector_store()
+    vector_store = get_vector_store(collection)
     storage_context = StorageContext.from_defaults(vector_store=vector_store)
 
     return VectorStoreIndex.from_vector_store(
@@ -24,13 +60,151 @@ def get_index() -> VectorStoreIndex:
     )
 
 
+def _chunk_id(i: int, doc: Any) -> str:
+    # Same document ID + same position -> same Qdrant point ID, so re-ingest overwrites
+    # instead of appending duplicates.
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{doc.doc_id}#{i}"))
+
+
+def get_splitter() -> NodeParser:
+    """Structure-aware splitter (chunking.py); CHUNKING=sentence restores the fixed SentenceSplitter."""
+    if chunking_mode() == "sentence":
+        return SentenceSplitter(chunk_size=chunk_size(), chunk_overlap=chunk_overlap(), id_func=_chunk_id)
+    return get_structured_splitter(id_func=_chunk_id)
+
+
 def ingest_documents(documents: List[Any]) -> Dict[str, Any]:
     index = get_index()
 
-    splitter = SentenceSplitter(chunk_size=512, chunk_overlap=64)
+    splitter = get_splitter()
     nodes = splitter.get_nodes_from_documents(documents)
 
     # llama-index 0.14.x uses insert_nodes (NOT insert_documents)
     index.insert_nodes(nodes)
 
+    sparse = get_sparse_index()
+    sparse.add_nodes(nodes)
+    sparse.save()
+
     return {"documents": len(documents), "chunks": len(nodes)}
+
+
+def ingest_directory(
+    data_dir: str,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """
+    Incremental ingest driven by the per-collection manifest:
+    - unchanged files are skipped (no parsing, no embedding)
+    - modified files have their old chunks deleted, then are re-split and re-embedded
+    - files removed from data_dir have their chunks purged; files still there but excluded by
+      the ingest filters keep theirs and are counted as skipped
+    New/modified files go through the streaming pipeline in pipeline.py.
+    on_progress / should_stop are forwarded to it (used by background ingest jobs).
+    Ingests into the current knowledge base (tenancy.use_kb); with a tenant, its chunks are
+    tagged with TENANT_FIELD in the shared collection.
+    """
+    manifest_path = get_manifest_path()
+    manifest = load_manifest(manifest_path)
+    plan = plan_changes(data_dir, manifest)
+    files: Dict[str, Dict[str, Any]] = manifest.setdefault("files", {})
+
+    sparse = get_sparse_index()
+    faq_store = get_faq_store()
+    signature = chunking_signature()
+    # The manifest can outlive the vector store (collection dropped, Qdrant wiped or :memory:)
+    index = get_index()
+    indexed = has_points(index.vector_store, current_tenant())
+    lost = not indexed and any(entry.get("chunk_ids") for entry in files.values())
+    if plan["skipped"] and (lost or len(sparse) == 0 or manifest.get("chunking") != signature):
+        # Collection missing or empty, indexed before the BM25 index existed (or its state was
+        # lost), or split with other chunking settings (or before chunk metadata existed):
+        # rebuild everything
+        plan["updated"] += plan["skipped"]
+        plan["skipped"] = []
+
+    changed = plan["added"] + plan["updated"]
+    if on_progress:
+        on_progress({"files_total": len(changed), "files": 0, "documents": 0, "chunks": 0})
+    stale = stale_chunk_ids(manifest, plan["updated"] + plan["deleted"])
+
+    if not indexed:
+        # A cached handle may still believe a dropped collection exists and skip recreating it
+        index = _index(current_collection())
+        keep_kb_object(collection_state_dir(current_collection()), "index", index)
+    if stale:
+        if indexed:
+            index.vector_store.delete_nodes(stale)
+        sparse.remove(stale)
+        # Precomputed answers citing replaced/deleted chunks stop being served
+        faq_stale = faq_store.invalidate(stale)
+    else:
+        faq_stale = 0
+    for rel in plan["deleted"]:
+        files.pop(rel, None)
+
+    result: Dict[str, Any] = {"documents": 0, "chunks": 0, "chunk_ids": {}, "failed": {}, "cancelled": False}
+    if changed:
+        result = run_pipeline(
+            {rel: plan["files"][rel] for rel in changed},
+            splitter=get_splitter(),
+            embed_model=Settings.embed_model,
+            vector_store=index.vector_store,
+            on_progress=on_progress,
+            should_stop=should_stop,
+            sparse_index=sparse,
+            tenant=current_tenant(),
+        )
+        # A cancelled run only records files whose chunks were fully upserted; files that failed
+        # to parse are left out of the manifest so the next run retries them
+        done = list(result["chunk_ids"]) if result["cancelled"] else changed
+        for rel in [r for r in done if r not in result["failed"]]:
+            files[rel] = {**plan["files"][rel], "chunk_ids": result["chunk_ids"].get(rel, [])}
+
+    # Refresh size/mtime of touched-but-identical files so the next run takes the fast path
+    for rel in plan["skipped"]:
+        files[rel] = {**files[rel], **plan["files"][rel]}
+
+    if not result["cancelled"]:
+        # A cancelled rebuild keeps the old signature, so the next run finishes re-splitting
+        manifest["chunking"] = signature
+    if changed or plan["deleted"]:
+        manifest["generation"] = manifest.get("generation", 0) + 1
+    save_manifest(manifest, manifest_path)
+
+    topics = get_topic_store()
+    if changed or plan["deleted"] or (files and len(topics) == 0):
+        # Per-file topic vocabularies for the relevance guard, learned from the BM25 term counts
+        file_chunks: Dict[str, List[str]] = {}
+        for rel, entry in files.items():
+            file_chunks.setdefault(Path(rel).name, []).extend(entry.get("chunk_ids", []))
+        topics.rebuild(file_chunks, sparse)
+
+    if changed or plan["deleted"]:
+        sparse.save()
+        on_index_changed()
+
+    # A long ingest may outlive this knowledge base's cache entry: keep the stores it updated
+    state_dir = manifest_path.parent
+    keep_kb_object(state_dir, "bm25", sparse)
+    keep_kb_object(state_dir, "faq", faq_store)
+    keep_kb_object(state_dir, "topics", topics)
+
+    for outcome in ("added", "updated", "skipped", "deleted"):
+        INGEST_FILES_TOTAL.inc(len(plan[outcome]), outcome=outcome)
+    INGEST_FILES_TOTAL.inc(len(plan["excluded"]), outcome="skipped")
+    INGEST_FILES_TOTAL.inc(len(result["failed"]), outcome="failed")
+
+    return {
+        "added": len(plan["added"]),
+        "updated": len(plan["updated"]),
+        "skipped": len(plan["skipped"]) + len(plan["excluded"]),
+        "deleted": len(plan["deleted"]),
+        "documents": result["documents"],
+        "chunks": result["chunks"],
+        "chunks_deleted": len(stale),
+        "faq_stale": faq_stale,
+        "failed": result["failed"],
+        "cancelled": result["cancelled"],
+    }
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from core_ai.rag_pipeline.indexing.tenancy import current_collection, current_tenant
+from core_ai.rag_pipeline.ingestion.load_documents import iter_files
+
+
+MANIFEST_VERSION = 1
+
+
+def collection_state_dir(collection: str | None = None) -> Path:
+    """INDEX_STATE_DIR/<collection>: state shared by every tenant of a collection."""
+    return Path(os.getenv("INDEX_STATE_DIR", "./data/index_state")) / (collection or current_collection())
+
+
+def get_manifest_path(collection: str | None = None, tenant: str | None = None) -> Path:
+    """
+    One manifest per knowledge base (collection, or tenant inside a shared collection), stored
+    outside DATA_DIR so it is never ingested. Defaults to the current one (tenancy.use_kb).
+    """
+    state_dir = collection_state_dir(collection)
+    tenant = tenant or current_tenant()
+    if tenant:
+        state_dir = state_dir / "tenants" / tenant
+    return state_dir / "manifest.json"
+
+
+# Per-knowledge-base objects (index handle, BM25 index, FAQ and topic stores, text store), grouped
+# by state directory in one LRU: a knowledge base is evicted as a whole, so memory stays bounded
+# however many collections and tenants one process serves
+_kb_objects: "OrderedDict[Path, Dict[str, Any]]" = OrderedDict()
+_kb_lock = threading.Lock()
+
+
+def kb_object(state_dir: Path, name: str, factory: Callable[[], Any]) -> Any:
+    """
+    The knowledge base's `name` object, created by factory() on first use. At most
+    INDEX_CACHE_SIZE knowledge bases (state directories) are kept; the least recently used one
+    is dropped with all its objects.
+    """
+    with _kb_lock:
+        objects = _kb_objects.setdefault(state_dir, {})
+        _kb_objects.move_to_end(state_dir)
+        obj = objects.get(name)
+    if obj is not None:
+        return obj
+    # Built outside the lock (an index handle may load the embedding model); first one wins
+    created = factory()
+    with _kb_lock:
+        objects = _kb_objects.setdefault(state_dir, objects)
+        obj = objects.setdefault(name, created)
+        while len(_kb_objects) > max(1, int(os.getenv("INDEX_CACHE_SIZE", "16"))):
+            _kb_objects.popitem(last=False)
+    return obj
+
+
+def keep_kb_object(state_dir: Path, name: str, obj: Any) -> None:
+    """
+    Make obj the knowledge base's `name` object again. Used by ingestion for the stores it wrote
+    to, in case the knowledge base was evicted (and reloaded from disk by a request) meanwhile.
+    """
+    with _kb_lock:
+        _kb_objects.setdefault(state_dir, {})[name] = obj
+        _kb_objects.move_to_end(state_dir)
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    if not path.exists():
+        return {"version": MANIFEST_VERSION, "generation": 0, "files": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(manifest: Dict[str, Any], path: Path) -> None:
+    # Write-then-rename so a crash mid-ingest never leaves a truncated manifest
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def hash_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def list_files(data_dir: str) -> Dict[str, Path]:
+    """
+    Returns {relative posix path: absolute path} for every file under data_dir that ingestion
+    accepts (non-hidden, INGEST_EXTENSIONS, INGEST_MAX_FILE_MB; see load_documents.iter_files).
+    """
+    return {rel: path for rel, path, _ in iter_files(data_dir)}
+
+
+def plan_changes(data_dir: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Diff DATA_DIR against the manifest.
+
+    Size + mtime is the fast path; the content hash is only computed when those differ,
+    so a touched-but-identical file is still skipped.
+    Returns {"added", "updated", "skipped", "excluded", "deleted": [...], "files": {...}} where
+    "files" holds the fresh size/mtime/sha256 for every added/updated/skipped entry.
+    "excluded" are indexed files still on disk that no longer pass the ingest filters (e.g.
+    INGEST_EXTENSIONS narrowed): they keep their chunks; only files gone from disk are deleted.
+    """
+    known: Dict[str, Dict[str, Any]] = manifest.get("files", {})
+    current = list_files(data_dir)
+
+    plan: Dict[str, Any] = {"added": [], "updated": [], "skipped": [], "excluded": [], "deleted": [], "files": {}}
+
+    for rel, path in current.items():
+        st = path.stat()
+        entry = {"path": str(path), "size": st.st_size, "mtime": st.st_mtime}
+        old = known.get(rel)
+
+        if old and old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+            entry["sha256"] = old["sha256"]
+            plan["skipped"].append(rel)
+        else:
+            entry["sha256"] = hash_file(path)
+            if old is None:
+                plan["added"].append(rel)
+            elif old.get("sha256") == entry["sha256"]:
+                plan["skipped"].append(rel)
+            else:
+                plan["updated"].append(rel)
+
+        plan["files"][rel] = entry
+
+    for rel in sorted(set(known) - set(current)):
+        plan["excluded" if (Path(data_dir) / rel).is_file() else "deleted"].append(rel)
+    return plan
+
+
+def stale_chunk_ids(manifest: Dict[str, Any], rel_paths: List[str]) -> List[str]:
+    files = manifest.get("files", {})
+    return [cid for rel in rel_paths for cid in files.get(rel, {}).get("chunk_ids", [])]
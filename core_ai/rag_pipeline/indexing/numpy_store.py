@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterOperator,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.core.vector_stores.utils import (
+    build_metadata_filter_fn,
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+
+VECTORS_FILE = "vectors.f32"
+NODES_FILE = "nodes.jsonl"
+TOMBSTONES_FILE = "tombstones.txt"
+META_FILE = "meta.json"
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    In-process exact (brute-force cosine) vector index persisted to flat files:
+
+    - vectors.f32     row-major float32 matrix of L2-normalized embeddings, memory-mapped for search
+    - nodes.jsonl     one line per row: {"id", "ref", "meta", "node"}; node payloads (text) are
+                      read on demand via byte offsets, only IDs and metadata stay in memory
+    - tombstones.txt  deleted row numbers (append-only)
+
+    Writes only ever append. Replaced/deleted rows are tombstoned and the files are
+    compacted once dead rows outnumber live ones. Nothing is read until the first call.
+    """
+
+    stores_text: bool = True
+    flat_metadata: bool = False
+
+    path: str
+
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+    _loaded: bool = PrivateAttr(default=False)
+    _dim: Optional[int] = PrivateAttr(default=None)
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _refs: List[Optional[str]] = PrivateAttr(default_factory=list)
+    _meta: List[Dict[str, Any]] = PrivateAttr(default_factory=list)
+    _offsets: List[int] = PrivateAttr(default_factory=list)
+    _alive: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros(0, dtype=bool))
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _vectors: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    def __init__(self, path: str, **kwargs: Any) -> None:
+        super().__init__(path=path, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # ---------- loading ----------
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._load()
+            self._loaded = True
+
+    def _load(self) -> None:
+        if not os.path.exists(self._file(META_FILE)):
+            return
+        with open(self._file(META_FILE), "r", encoding="utf-8") as f:
+            self._dim = int(json.load(f)["dim"])
+
+        ids: List[str] = []
+        refs: List[Optional[str]] = []
+        meta: List[Dict[str, Any]] = []
+        offsets: List[int] = []
+        offset = 0
+        with open(self._file(NODES_FILE), "ab+") as f:
+            f.seek(0)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write from a crash; the row never completed
+                row = json.loads(line)
+                ids.append(row["id"])
+                refs.append(row.get("ref"))
+                meta.append(row.get("meta") or {})
+                offsets.append(offset)
+                offset += len(line)
+
+        # The two files are appended separately: keep only rows present in both, and cut
+        # the other file back so later appends stay aligned row for row
+        with open(self._file(VECTORS_FILE), "ab+") as f:
+            n = min(len(ids), f.tell() // (4 * self._dim))
+            f.truncate(n * 4 * self._dim)
+        with open(self._file(NODES_FILE), "ab+") as f:
+            f.truncate(offsets[n] if n < len(offsets) else offset)
+
+        alive = np.ones(n, dtype=bool)
+        if os.path.exists(self._file(TOMBSTONES_FILE)):
+            with open(self._file(TOMBSTONES_FILE), "r", encoding="utf-8") as f:
+                dead = [int(x) for x in f.read().split()]
+            alive[[r for r in dead if r < n]] = False
+
+        self._ids, self._refs, self._meta, self._offsets = ids[:n], refs[:n], meta[:n], offsets[:n]
+        self._alive = alive
+        self._rows = {node_id: row for row, node_id in enumerate(self._ids) if alive[row]}
+        self._vectors = None
+
+    def _matrix(self) -> np.ndarray:
+        # Re-mapped lazily after appends; pages are loaded by the OS on first touch
+        n = len(self._ids)
+        if self._vectors is None or self._vectors.shape[0] != n:
+            if n == 0:
+                self._vectors = np.zeros((0, self._dim or 0), dtype=np.float32)
+            else:
+                self._vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r", shape=(n, self._dim))
+        return self._vectors
+
+    def _read_node(self, row: int) -> Dict[str, Any]:
+        with open(self._file(NODES_FILE), "rb") as f:
+            f.seek(self._offsets[row])
+            return json.loads(f.readline())["node"]
+
+    # ---------- writes ----------
+
+    def _tombstone(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        for row in rows:
+            self._alive[row] = False
+            self._rows.pop(self._ids[row], None)
+        with open(self._file(TOMBSTONES_FILE), "a", encoding="utf-8") as f:
+            f.write("".join(f"{row}\n" for row in rows))
+
+        dead = len(self._ids) - len(self._rows)
+        if dead > max(1000, len(self._rows)):
+            self._compact()
+
+    def add(self, nodes: Sequence[BaseNode], **kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        self._ensure_loaded()
+
+        vectors = np.asarray([n.get_embedding() for n in nodes], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                with open(self._file(META_FILE), "w", encoding="utf-8") as f:
+                    json.dump({"dim": self._dim}, f)
+            if vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self._dim}")
+
+            # Upsert semantics (same as Qdrant): a re-added node ID replaces the old row
+            self._tombstone([self._rows[n.node_id] for n in nodes if n.node_id in self._rows])
+
+            lines = []
+            for node in nodes:
+                payload = node_to_metadata_dict(node, remove_text=False, flat_metadata=self.flat_metadata)
+                row = {"id": node.node_id, "ref": node.ref_doc_id, "meta": node.metadata, "node": payload}
+                lines.append((json.dumps(row) + "\n").encode("utf-8"))
+
+            with open(self._file(NODES_FILE), "ab") as f:
+                offset = f.tell()
+                f.write(b"".join(lines))
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+
+            start = len(self._ids)
+            for i, (node, line) in enumerate(zip(nodes, lines)):
+                self._ids.append(node.node_id)
+                self._refs.append(node.ref_doc_id)
+                self._meta.append(dict(node.metadata))
+                self._offsets.append(offset)
+                self._rows[node.node_id] = start + i
+                offset += len(line)
+            self._alive = np.concatenate([self._alive, np.ones(len(nodes), dtype=bool)])
+
+        return [n.node_id for n in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._ensure_loaded()
+        with self._lock:
+            self._tombstone([row for row in self._rows.values() if self._refs[row] == ref_doc_id])
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        self._ensure_loaded()
+        with self._lock:
+            if node_ids is None:
+                rows = list(self._rows.values()) if filters is not None else []
+            else:
+                rows = [self._rows[i] for i in node_ids if i in self._rows]
+            if filters is not None:
+                keep = self._filter_fn(filters)
+                rows = [r for r in rows if keep(self._ids[r])]
+            self._tombstone(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            for name in (VECTORS_FILE, NODES_FILE, TOMBSTONES_FILE, META_FILE):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+            self._loaded = False
+            self._dim = None
+            self._ids, self._refs, self._meta, self._offsets, self._rows = [], [], [], [], {}
+            self._alive = np.zeros(0, dtype=bool)
+            self._vectors = None
+
+    def _compact(self) -> None:
+        """Rewrite both files with live rows only (temp files + atomic rename)."""
+        live = np.flatnonzero(self._alive)
+        matrix = self._matrix()
+
+        tmp_vectors, tmp_nodes = self._file(VECTORS_FILE + ".tmp"), self._file(NODES_FILE + ".tmp")
+        offsets: List[int] = []
+        with open(tmp_vectors, "wb") as vf, open(tmp_nodes, "wb") as nf, open(self._file(NODES_FILE), "rb") as src:
+            for start in range(0, len(live), 4096):
+                rows = live[start : start + 4096]
+                vf.write(np.ascontiguousarray(matrix[rows]).tobytes())
+                for row in rows:
+                    src.seek(self._offsets[row])
+                    offsets.append(nf.tell())
+                    nf.write(src.readline())
+
+        self._vectors = None
+        os.replace(tmp_vectors, self._file(VECTORS_FILE))
+        os.replace(tmp_nodes, self._file(NODES_FILE))
+        if os.path.exists(self._file(TOMBSTONES_FILE)):
+            os.remove(self._file(TOMBSTONES_FILE))
+
+        self._ids = [self._ids[r] for r in live]
+        self._refs = [self._refs[r] for r in live]
+        self._meta = [self._meta[r] for r in live]
+        self._offsets = offsets
+        self._alive = np.ones(len(live), dtype=bool)
+        self._rows = {node_id: row for row, node_id in enumerate(self._ids)}
+
+    # ---------- reads ----------
+
+    def _metadata(self, node_id: str) -> Dict[str, Any]:
+        row = self._rows.get(node_id)
+        return self._meta[row] if row is not None else {}
+
+    def _filter_fn(self, filters: MetadataFilters):
+        # build_metadata_filter_fn() has no IS_EMPTY (the untagged-tenant filter): checked here,
+        # AND-ed with the other filters
+        empty = [f.key for f in filters.filters if getattr(f, "operator", None) == FilterOperator.IS_EMPTY]
+        if not empty:
+            return build_metadata_filter_fn(self._metadata, filters)
+        rest = build_metadata_filter_fn(
+            self._metadata,
+            MetadataFilters(filters=[f for f in filters.filters if getattr(f, "operator", None) != FilterOperator.IS_EMPTY]),
+        )
+        return lambda node_id: rest(node_id) and all(self._metadata(node_id).get(k) in (None, "", []) for k in empty)
+
+    def get_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+    ) -> List[BaseNode]:
+        self._ensure_loaded()
+        with self._lock:
+            rows = [self._rows[i] for i in node_ids if i in self._rows] if node_ids else list(self._rows.values())
+            if filters is not None:
+                keep = self._filter_fn(filters)
+                rows = [r for r in rows if keep(self._ids[r])]
+            matrix = self._matrix()
+            nodes = []
+            for r in rows:
+                node = metadata_dict_to_node(self._read_node(r))
+                node.embedding = matrix[r].tolist()
+                nodes.append(node)
+            return nodes
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        self._ensure_loaded()
+        k = query.similarity_top_k or 1
+
+        # Snapshot under the lock, score outside it: concurrent queries overlap in BLAS,
+        # and a memory-mapped matrix stays valid even if a compaction replaces the file.
+        with self._lock:
+            if not self._rows or query.query_embedding is None:
+                return VectorStoreQueryResult(nodes=[], similarities=[], ids=[])
+            matrix, alive, ids = self._matrix(), self._alive.copy(), self._ids
+
+        q = np.array(query.query_embedding, dtype=np.float32)
+        q /= np.linalg.norm(q) + 1e-12
+        scores = np.asarray(matrix @ q)
+        scores[~alive[: len(scores)]] = -np.inf
+
+        keep = self._filter_fn(query.filters) if query.filters is not None else None
+        if query.node_ids:
+            allowed = set(query.node_ids)
+            base_keep = keep
+            keep = lambda i: i in allowed and (base_keep is None or base_keep(i))  # noqa: E731
+
+        # Over-fetch in growing windows so selective filters still return k hits
+        n = len(scores)
+        window = k if keep is None else k * 8
+        while True:
+            window = min(window, n)
+            top = np.argpartition(-scores, window - 1)[:window] if window < n else np.arange(n)
+            top = top[np.argsort(-scores[top])]
+            hits = [int(r) for r in top if np.isfinite(scores[r]) and (keep is None or keep(ids[r]))]
+            if len(hits) >= k or window >= n:
+                break
+            window *= 4
+
+        nodes, similarities, result_ids = [], [], []
+        with self._lock:
+            for r in hits[:k]:
+                row = self._rows.get(ids[r])
+                if row is None:  # deleted since the snapshot
+                    continue
+                nodes.append(metadata_dict_to_node(self._read_node(row)))
+                similarities.append(float(scores[r]))
+                result_ids.append(ids[r])
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=result_ids)
+
+    def count(self) -> int:
+        self._ensure_loaded()
+        return len(self._rows)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from llama_index.core.schema import MetadataMode
+
+from core_ai.observability.metrics import INGEST_CHUNKS_TOTAL, INGEST_DOCUMENTS_TOTAL, stage
+from core_ai.rag_pipeline.indexing.tenancy import tenant_field
+from core_ai.rag_pipeline.ingestion.load_documents import iter_parsed, parse_timeout, parse_workers
+
+
+def _env_int(name: str, default: int) -> int:
+    return max(1, int(os.getenv(name, str(default))))
+
+
+def _timed_add(vector_store: Any, nodes: List[Any]) -> None:
+    with stage("upsert", pipeline="ingest"):
+        vector_store.add(nodes)
+
+
+def run_pipeline(
+    files: Dict[str, Dict[str, Any]],
+    splitter: Any,
+    embed_model: Any,
+    vector_store: Any,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    sparse_index: Optional[Any] = None,
+    tenant: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Streaming ingest: parse (process pool) -> split (per file) -> embed (large CPU batches)
+    -> upsert (thread pool), with back-pressure between stages.
+
+    files: {rel_path: {"path": abs path, "sha256": ...}} for every file to (re)index.
+    sparse_index: optional BM25 index that receives every flushed batch (same chunk IDs).
+    tenant: tags every document with TENANT_FIELD (kept out of the embedded and prompt text)
+    and namespaces its IDs, so tenants of a shared collection never overwrite each other.
+    Returns {"documents": int, "chunks": int, "chunk_ids": {rel_path: [chunk ids]},
+    "failed": {rel_path: reason}, "cancelled": bool}. Files that fail to parse or exceed
+    INGEST_PARSE_TIMEOUT_S are reported in "failed" and do not stop the run.
+
+    should_stop is polled between files; when it returns True the pipeline drains in-flight
+    upserts, drops the unflushed batch and reports only files whose chunks were all upserted.
+    Chunk IDs are deterministic, so the dropped files are simply redone on the next run.
+
+    Peak memory is bounded by the parse window + one embed batch + UPSERT_MAX_PENDING batches,
+    independent of corpus size.
+    """
+    embed_batch_size = _env_int("EMBED_BATCH_SIZE", 64)
+    upsert_workers = _env_int("UPSERT_WORKERS", 4)
+    max_pending = _env_int("UPSERT_MAX_PENDING", upsert_workers * 2)
+
+    stats = {"files": 0, "documents": 0, "chunks": 0}
+    chunk_ids: Dict[str, List[str]] = defaultdict(list)
+    failed: Dict[str, str] = {}
+    batch: List[Any] = []
+    in_flight: Deque[Future] = deque()
+    collection_ready = False
+    cancelled = False
+
+    def flush(upserts: ThreadPoolExecutor) -> None:
+        nonlocal batch, collection_ready
+        if not batch:
+            return
+        nodes, batch = batch, []
+
+        texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+        with stage("embed", pipeline="ingest"):
+            embeddings = embed_model.get_text_embedding_batch(texts)
+        for node, emb in zip(nodes, embeddings):
+            node.embedding = emb
+
+        if not collection_ready:
+            # First upsert creates the collection; do it inline to avoid racing creators
+            _timed_add(vector_store, nodes)
+            collection_ready = True
+        else:
+            # Back-pressure: never hold more than max_pending embedded batches in memory
+            while len(in_flight) >= max_pending:
+                in_flight.popleft().result()
+            in_flight.append(upserts.submit(_timed_add, vector_store, nodes))
+
+        if sparse_index is not None:
+            sparse_index.add_nodes(nodes)
+
+        stats["chunks"] += len(nodes)
+        INGEST_CHUNKS_TOTAL.inc(len(nodes))
+        if on_progress:
+            on_progress(dict(stats))
+
+    key = tenant_field()
+    paths = ((rel, entry["path"]) for rel, entry in files.items())
+    with ThreadPoolExecutor(max_workers=upsert_workers) as upserts:
+        for rel, documents, error in iter_parsed(paths, parse_workers(), parse_timeout()):
+            if should_stop and should_stop():
+                cancelled = True
+                break
+            if error is not None:
+                failed[rel] = error
+                continue
+
+            # Deterministic document IDs: [<tenant>:]<relative path>#<content hash>#<part>
+            for part, doc in enumerate(documents):
+                doc.id_ = f"{tenant + ':' if tenant else ''}{rel}#{files[rel]['sha256']}#{part}"
+                if tenant:
+                    doc.metadata[key] = tenant
+                    doc.excluded_embed_metadata_keys.append(key)
+                    doc.excluded_llm_metadata_keys.append(key)
+
+            with stage("split", pipeline="ingest"):
+                nodes = splitter.get_nodes_from_documents(documents)
+
+            for node in nodes:
+                chunk_ids[rel].append(node.node_id)
+                batch.append(node)
+                if len(batch) >= embed_batch_size:
+                    flush(upserts)
+
+            stats["files"] += 1
+            stats["documents"] += len(documents)
+            INGEST_DOCUMENTS_TOTAL.inc(len(documents))
+            if on_progress:
+                on_progress(dict(stats))
+
+        if cancelled:
+            partial = {n.node_id for n in batch}
+            for rel in [r for r, ids in chunk_ids.items() if partial.intersection(ids)]:
+                del chunk_ids[rel]
+            batch = []
+        flush(upserts)
+        while in_flight:
+            in_flight.popleft().result()
+
+    return {
+        "documents": stats["documents"],
+        "chunks": stats["chunks"],
+        "chunk_ids": dict(chunk_ids),
+        "failed": failed,
+        "cancelled": cancelled,
+    }
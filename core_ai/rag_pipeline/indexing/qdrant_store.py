@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode, MetadataMode, NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import MetadataFilters, VectorStoreQuery, VectorStoreQueryResult
+from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import models
+
+from core_ai.rag_pipeline.indexing.vector_store import create_collection, search_params
+
+
+class ChunkTextStore:
+    """
+    Chunk text kept outside Qdrant (CHUNK_TEXT_STORE=local): one SQLite file per collection,
+    keyed by chunk ID, so point payloads stay a few bytes and Qdrant memory only holds vectors.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, doc_id TEXT, text TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id)")
+            self._conn = conn
+        return self._conn
+
+    def put(self, rows: Iterable[Tuple[str, Optional[str], str]]) -> None:
+        """rows: (chunk_id, doc_id, text)"""
+        with self._lock:
+            db = self._db()
+            db.executemany("INSERT OR REPLACE INTO chunks (id, doc_id, text) VALUES (?, ?, ?)", list(rows))
+            db.commit()
+
+    def get(self, ids: Sequence[str]) -> Dict[str, str]:
+        if not ids:
+            return {}
+        with self._lock:
+            db = self._db()
+            out: Dict[str, str] = {}
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                part = list(ids[i : i + 500])
+                marks = ",".join("?" * len(part))
+                out.update(db.execute(f"SELECT id, text FROM chunks WHERE id IN ({marks})", part).fetchall())
+            return out
+
+    def delete(self, ids: Sequence[str]) -> None:
+        with self._lock:
+            db = self._db()
+            db.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+            db.commit()
+
+    def delete_doc(self, doc_id: str) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+            db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM chunks")
+            db.commit()
+
+
+def slim_payload(node: BaseNode, fields: Sequence[str], with_text: bool) -> Dict[str, Any]:
+    """
+    Only what retrieval reads: selected metadata fields (file name; filter keys), the source
+    document ID and character span (context merging, delete by document) and, unless it lives
+    in the ChunkTextStore, the text. LlamaIndex's default payload is the whole serialized node.
+    """
+    meta = node.metadata or {}
+    payload: Dict[str, Any] = {field: meta[field] for field in fields if field in meta}
+    payload["doc_id"] = node.ref_doc_id
+    payload["start"] = node.start_char_idx
+    payload["end"] = node.end_char_idx
+    if with_text:
+        payload["text"] = node.get_content(metadata_mode=MetadataMode.NONE)
+    return payload
+
+
+class SlimQdrantVectorStore(QdrantVectorStore):
+    """
+    QdrantVectorStore that writes slim payloads (slim_payload()) and searches with the
+    collection's tuned search params (HNSW ef, quantization rescoring). Collections are created
+    through vector_store.create_collection(). Points written with LlamaIndex's full payload
+    (before migration) are still read correctly.
+    """
+
+    _payload_fields: Tuple[str, ...] = PrivateAttr(default=("file_name",))
+    _text_store: Optional[ChunkTextStore] = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        *args: Any,
+        payload_fields: Sequence[str] = ("file_name",),
+        text_store: Optional[ChunkTextStore] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._payload_fields = tuple(payload_fields)
+        self._text_store = text_store
+
+    def _create_collection(self, collection_name: str, vector_size: int) -> None:
+        if not self._client.collection_exists(collection_name):
+            create_collection(self._client, collection_name, vector_size, self.dense_vector_name)
+        self._collection_initialized = True
+
+    async def _acreate_collection(self, collection_name: str, vector_size: int) -> None:
+        # Ingestion writes through the sync client; this only runs if an async add comes first
+        self._create_collection(collection_name, vector_size)
+
+    def _build_points(self, nodes: List[BaseNode], sparse_vector_name: str) -> Tuple[List[Any], List[str]]:
+        points = [
+            models.PointStruct(
+                id=node.node_id,
+                vector={self.dense_vector_name: node.get_embedding()},
+                payload=slim_payload(node, self._payload_fields, with_text=self._text_store is None),
+            )
+            for node in nodes
+        ]
+        if self._text_store is not None:
+            self._text_store.put(
+                (node.node_id, node.ref_doc_id, node.get_content(metadata_mode=MetadataMode.NONE))
+                for node in nodes
+            )
+        return points, [node.node_id for node in nodes]
+
+    def parse_to_query_result(self, response: List[Any]) -> VectorStoreQueryResult:
+        legacy = [p for p in response if "_node_content" in (p.payload or {})]
+        parsed = {}
+        if legacy:
+            result = super().parse_to_query_result(legacy)
+            parsed = {str(p.id): node for p, node in zip(legacy, result.nodes)}
+
+        texts: Dict[str, str] = {}
+        if self._text_store is not None:
+            texts = self._text_store.get(
+                [str(p.id) for p in response if str(p.id) not in parsed and "text" not in (p.payload or {})]
+            )
+
+        nodes, similarities, ids = [], [], []
+        for point in response:
+            point_id = str(point.id)
+            node = parsed.get(point_id)
+            if node is None:
+                node = self._slim_to_node(point_id, point.payload or {}, texts.get(point_id, ""), point.vector)
+            nodes.append(node)
+            ids.append(point_id)
+            score = getattr(point, "score", None)
+            similarities.append(score if score is not None else 1.0)
+        return VectorStoreQueryResult(nodes=nodes, similarities=similarities, ids=ids)
+
+    def _slim_to_node(self, point_id: str, payload: Dict[str, Any], text: str, vector: Any) -> TextNode:
+        embedding = vector.get(self.dense_vector_name, vector.get("")) if isinstance(vector, dict) else vector
+        meta = {k: v for k, v in payload.items() if k not in ("doc_id", "start", "end", "text")}
+        relationships = {}
+        if payload.get("doc_id"):
+            relationships[NodeRelationship.SOURCE] = RelatedNodeInfo(node_id=payload["doc_id"])
+        return TextNode(
+            id_=point_id,
+            text=payload.get("text", text),
+            metadata=meta,
+            start_char_idx=payload.get("start"),
+            end_char_idx=payload.get("end"),
+            relationships=relationships,
+            embedding=embedding,
+        )
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        kwargs.setdefault("search_params", search_params())
+        return super().query(query, **kwargs)
+
+    async def aquery(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        kwargs.setdefault("search_params", search_params())
+        return await super().aquery(query, **kwargs)
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        super().delete(ref_doc_id, **delete_kwargs)
+        if self._text_store is not None:
+            self._text_store.delete_doc(ref_doc_id)
+
+    def delete_nodes(
+        self,
+        node_ids: Optional[List[str]] = None,
+        filters: Optional[MetadataFilters] = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        super().delete_nodes(node_ids=node_ids, filters=filters, **delete_kwargs)
+        # Filter-only deletes leave their text rows behind; they are never read again
+        if self._text_store is not None and node_ids:
+            self._text_store.delete(node_ids)
+
+    def clear(self) -> None:
+        super().clear()
+        if self._text_store is not None:
+            self._text_store.clear()
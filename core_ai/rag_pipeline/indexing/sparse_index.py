@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from llama_index.core.schema import MetadataMode
+
+from core_ai.rag_pipeline.indexing.manifest import get_manifest_path, kb_object
+
+
+SPARSE_VERSION = 2
+
+# Lowercased alphanumeric runs: keeps error codes ("691"), SSID parts and product names intact
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "if", "in", "is", "it", "my", "of", "on", "or", "our", "the", "this", "to", "we",
+    "what", "when", "where", "which", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def node_text(node: Any) -> str:
+    # File name and section title are included so "vpn"/"wifi"-style topic words match even when
+    # the body doesn't repeat them
+    meta = node.metadata or {}
+    return f"{meta.get('file_name', '')} {meta.get('section_title', '')} {node.get_content(metadata_mode=MetadataMode.NONE)}"
+
+
+class SparseIndex:
+    """
+    BM25 index over chunks, keyed by the same chunk IDs as the vector store.
+
+    An inverted index maintained in place: every chunk gets a row, every term a posting list of
+    (row, term frequency) in growable arrays, plus per-row lengths. Writes only touch the terms
+    of the chunks written, so a search right after an ingest batch costs the same as any other.
+    BM25 weights (IDF, length normalisation) are computed at query time for the query's own
+    postings, one vectorised pass per query term.
+
+    Removed or replaced chunks leave dead rows behind (length 0, ignored by search); save()
+    compacts them away once per ingest, on a snapshot outside the lock, and persists the
+    postings (bm25.npz).
+    """
+
+    def __init__(self, path: Path, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._rows: Dict[str, int] = {}  # live chunk ID -> row
+        self._ids: List[Optional[str]] = []  # row -> chunk ID (None: dead row)
+        self._lengths = array("f")  # row -> token count (0 for dead rows)
+        self._postings: Dict[str, Tuple[array, array]] = {}  # term -> (rows, term frequencies)
+        self._total_length = 0.0
+        self._writes = 0  # bumped by every write; save() only swaps in a compaction of the latest state
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as data:
+                if int(data["version"]) != SPARSE_VERSION:
+                    return
+                ids, lengths = data["doc_ids"].tolist(), data["lengths"]
+                terms, offsets, rows, tfs = data["terms"].tolist(), data["offsets"], data["rows"], data["tfs"]
+            self._ids = list(ids)
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+            self._lengths = array("f", lengths.astype(np.float32).tobytes())
+            self._total_length = float(lengths.sum())
+            for i, term in enumerate(terms):
+                a, b = int(offsets[i]), int(offsets[i + 1])
+                self._postings[term] = (array("i", rows[a:b].tobytes()), array("f", tfs[a:b].tobytes()))
+            return
+
+        legacy = self.path.with_suffix(".json")
+        if legacy.exists():
+            # Forward index written by earlier versions: index it once, saved as postings next time
+            docs = json.loads(legacy.read_text(encoding="utf-8")).get("docs", {})
+            for chunk_id, tf in docs.items():
+                self._add(chunk_id, tf)
+
+    def _kill(self, chunk_id: str) -> None:
+        row = self._rows.pop(chunk_id, None)
+        if row is None:
+            return
+        self._total_length -= self._lengths[row]
+        self._lengths[row] = 0.0
+        self._ids[row] = None
+
+    def _add(self, chunk_id: str, tf: Dict[str, int]) -> None:
+        self._kill(chunk_id)
+        row = len(self._ids)
+        self._ids.append(chunk_id)
+        self._rows[chunk_id] = row
+        length = float(sum(tf.values()))
+        self._lengths.append(length)
+        self._total_length += length
+        for term, count in tf.items():
+            rows, counts = self._postings.setdefault(term, (array("i"), array("f")))
+            rows.append(row)
+            counts.append(count)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._rows)
+
+    def add_nodes(self, nodes: Iterable[Any]) -> None:
+        """Index (or re-index) chunks; same-ID chunks are replaced."""
+        entries = [(n.node_id, Counter(tokenize(node_text(n)))) for n in nodes]
+        with self._lock:
+            self._load()
+            for chunk_id, tf in entries:
+                self._add(chunk_id, tf)
+            self._writes += 1
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._load()
+            for chunk_id in chunk_ids:
+                self._kill(chunk_id)
+            self._writes += 1
+
+    def term_counts_by_group(self, groups: Mapping[str, Iterable[str]]) -> Dict[str, Counter]:
+        """
+        Summed term frequencies per group of chunk IDs ({file name: chunk IDs} -> {file name:
+        Counter}); unknown IDs are ignored. One pass over the postings, outside the lock.
+        """
+        names = list(groups)
+        with self._lock:
+            self._load()
+            group_of = np.full(len(self._ids), -1, dtype=np.int64)
+            for g, name in enumerate(names):
+                for chunk_id in groups[name]:
+                    row = self._rows.get(chunk_id)
+                    if row is not None:
+                        group_of[row] = g
+            snapshot = [(term, np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.float32))
+                        for term, (rows, tfs) in self._postings.items()]
+
+        counts: Dict[str, Counter] = {name: Counter() for name in names}
+        for term, rows, tfs in snapshot:
+            g = group_of[rows]
+            keep = g >= 0
+            if not keep.any():
+                continue
+            totals = np.bincount(g[keep], weights=tfs[keep], minlength=len(names))
+            for i in np.flatnonzero(totals):
+                counts[names[i]][term] = int(totals[i])
+        return counts
+
+    def save(self) -> None:
+        """Compacts dead rows (if any) and writes the postings. Call once per ingest, not per batch."""
+        with self._lock:
+            self._load()
+            writes = self._writes
+            ids = list(self._ids)
+            lengths = np.array(self._lengths, dtype=np.float32)
+            postings = [(term, np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.float32))
+                        for term, (rows, tfs) in self._postings.items()]
+
+        # Compaction on the snapshot: live rows renumbered in order, dead postings dropped
+        alive = np.asarray([chunk_id is not None for chunk_id in ids], dtype=bool)
+        new_row = np.cumsum(alive, dtype=np.int64) - 1
+        ids = [chunk_id for chunk_id in ids if chunk_id is not None]
+        lengths = lengths[alive]
+        terms: List[str] = []
+        row_parts: List[np.ndarray] = []
+        tf_parts: List[np.ndarray] = []
+        for term, rows, tfs in postings:
+            keep = alive[rows]
+            if keep.any():
+                terms.append(term)
+                row_parts.append(new_row[rows[keep]].astype(np.int32))
+                tf_parts.append(tfs[keep])
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(r) for r in row_parts])
+        all_rows = np.concatenate(row_parts) if row_parts else np.zeros(0, dtype=np.int32)
+        all_tfs = np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.float32)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                version=np.asarray(SPARSE_VERSION),
+                doc_ids=np.asarray(ids, dtype=str),
+                lengths=lengths,
+                terms=np.asarray(terms, dtype=str),
+                offsets=offsets,
+                rows=all_rows,
+                tfs=all_tfs,
+            )
+        os.replace(tmp, self.path)
+
+        with self._lock:
+            # Writes that raced with the compaction keep the uncompacted (still correct) state
+            if self._writes != writes:
+                return
+            self._ids = ids
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+            self._lengths = array("f", lengths.tobytes())
+            self._total_length = float(lengths.sum())
+            self._postings = {
+                term: (array("i", row_parts[i].tobytes()), array("f", tf_parts[i].tobytes()))
+                for i, term in enumerate(terms)
+            }
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Top-k (chunk ID, BM25 score) for the query; empty if no query term is indexed."""
+        if top_k <= 0:
+            return []
+        with self._lock:
+            self._load()
+            n = len(self._rows)
+            terms = [t for t in set(tokenize(query)) if t in self._postings]
+            if not terms or n == 0:
+                return []
+            # Copies of the few postings involved, so the scoring below runs without the lock
+            lengths = np.array(self._lengths, dtype=np.float32)
+            postings = [(np.array(self._postings[t][0], dtype=np.int32), np.array(self._postings[t][1], dtype=np.float32)) for t in terms]
+            ids = list(self._ids)
+            avgdl = self._total_length / n
+
+        norm_rows = self.k1 * (1 - self.b + self.b * lengths / max(avgdl, 1e-9))
+        scores = np.zeros(len(ids), dtype=np.float32)
+        for rows, tf in postings:
+            live = lengths[rows] > 0
+            rows, tf = rows[live], tf[live]
+            if not len(rows):
+                continue
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tf * (self.k1 + 1) / (tf + norm_rows[rows])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(ids[i], float(scores[i])) for i in hits]
+
+
+def get_sparse_index(collection: Optional[str] = None, tenant: Optional[str] = None) -> SparseIndex:
+    """
+    One BM25 index per knowledge base, stored next to its ingest manifest (so a tenant's
+    keyword hits never come from another tenant's documents).
+    """
+    state_dir = get_manifest_path(collection, tenant).parent
+    return kb_object(state_dir, "bm25", lambda: _sparse_index(state_dir))
+
+
+def _sparse_index(state_dir: Path) -> SparseIndex:
+    path = state_dir / "bm25.npz"
+    return SparseIndex(
+        path,
+        k1=float(os.getenv("BM25_K1", "1.2")),
+        b=float(os.getenv("BM25_B", "0.75")),
+    )
+
+
+def rrf_fuse(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Reciprocal-rank fusion: score(id) = sum over rankings of 1 / (k + rank).
+    Only ranks matter, so BM25 and cosine scores never need to be calibrated against each other.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+# Knowledge base selected for the current request / ingest job. Like request_timings(), the
+# values are seen by asyncio tasks and asyncio.to_thread() workers started inside use_kb().
+_current_collection: ContextVar[Optional[str]] = ContextVar("ekc_collection", default=None)
+_current_tenant: ContextVar[Optional[str]] = ContextVar("ekc_tenant", default=None)
+
+# Names end up in file paths (INDEX_STATE_DIR, KB_DATA_ROOT), so keep them to a safe alphabet
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class UnknownKnowledgeBase(ValueError):
+    """Invalid collection/tenant name, or a collection not listed in KB_COLLECTIONS."""
+
+
+def default_collection() -> str:
+    return os.getenv("QDRANT_COLLECTION", "enterprise_kb")
+
+
+def tenant_field() -> str:
+    """Payload / metadata key that tags each chunk with its tenant in a shared collection."""
+    return os.getenv("TENANT_FIELD", "tenant")
+
+
+def current_collection() -> str:
+    return _current_collection.get() or default_collection()
+
+
+def current_tenant() -> Optional[str]:
+    return _current_tenant.get()
+
+
+def resolve_kb(collection: Optional[str] = None, tenant: Optional[str] = None) -> tuple:
+    """
+    Validates a (collection, tenant) pair from a request; collection defaults to QDRANT_COLLECTION.
+    KB_COLLECTIONS (comma-separated, optional) restricts which collections can be addressed.
+    """
+    collection = collection or default_collection()
+    for name in (collection, tenant):
+        if name is not None and not _NAME.match(name):
+            raise UnknownKnowledgeBase(f"Invalid knowledge base name: {name!r}")
+
+    allowed = [c.strip() for c in os.getenv("KB_COLLECTIONS", "").split(",") if c.strip()]
+    if allowed and collection not in allowed and collection != default_collection():
+        raise UnknownKnowledgeBase(f"Unknown collection: {collection}")
+    return collection, tenant
+
+
+@contextmanager
+def use_kb(collection: Optional[str] = None, tenant: Optional[str] = None) -> Iterator[None]:
+    """
+    Run retrieval / ingestion against one knowledge base: a collection and, optionally, a tenant
+    inside it. Everything that is per knowledge base (index handle, BM25 index, FAQ store,
+    manifest) follows the context.
+    """
+    collection, tenant = resolve_kb(collection, tenant)
+    tokens = (_current_collection.set(collection), _current_tenant.set(tenant))
+    try:
+        yield
+    finally:
+        _current_collection.reset(tokens[0])
+        _current_tenant.reset(tokens[1])
+
+
+def kb_data_dir(collection: Optional[str] = None, tenant: Optional[str] = None) -> str:
+    """
+    Source folder of a knowledge base: DATA_DIR for the default collection, otherwise
+    KB_DATA_ROOT/<collection>[/<tenant>] (default root ./data/kbs).
+    """
+    collection = collection or current_collection()
+    if collection == default_collection() and tenant is None:
+        return os.getenv("DATA_DIR", "./data/raw_documents")
+    root = Path(os.getenv("KB_DATA_ROOT", "./data/kbs")) / collection
+    return str(root / tenant if tenant else root)
+
+
+def tenant_filters(tenant: Optional[str] = None) -> Any:
+    """
+    LlamaIndex metadata filter restricting search to one tenant. Without a tenant, search is
+    restricted to untagged chunks (those ingested without a tenant), so a request that names no
+    tenant never sees tenant documents in a shared collection.
+    """
+    tenant = tenant or current_tenant()
+    from llama_index.core.vector_stores.types import FilterOperator, MetadataFilter, MetadataFilters
+
+    if tenant is None:
+        return MetadataFilters(filters=[MetadataFilter(key=tenant_field(), value=None, operator=FilterOperator.IS_EMPTY)])
+    return MetadataFilters(filters=[MetadataFilter(key=tenant_field(), value=tenant)])
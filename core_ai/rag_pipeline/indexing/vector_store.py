@@ -1,9 +1,324 @@
+import argparse
+import json
 import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
 import qdrant_client
-from llama_index.vector_stores.qdrant import QdrantVectorStore
+from qdrant_client import models
+
+from core_ai.rag_pipeline.indexing.tenancy import current_collection, tenant_field
+
+
+def get_backend() -> str:
+    """
+    VECTOR_BACKEND selects where vectors live:
+    - "qdrant" (default): Qdrant server at QDRANT_URL
+    - "qdrant_local": Qdrant local mode, in-process, persisted under QDRANT_PATH
+    - "numpy": exact in-process index on memory-mapped files under VECTOR_INDEX_DIR
+    """
+    backend = os.getenv("VECTOR_BACKEND", "").strip().lower()
+    if backend:
+        if backend not in ("qdrant", "qdrant_local", "numpy"):
+            raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+        return backend
+    return "qdrant_local" if os.getenv("QDRANT_PATH") else "qdrant"
+
+
+def is_local_mode() -> bool:
+    """
+    True when search runs inside this process (no server round trip): the numpy backend,
+    Qdrant local mode, or QDRANT_URL=":memory:" for a throwaway store (tests, offline benchmarks).
+    """
+    return get_backend() != "qdrant" or os.getenv("QDRANT_URL") == ":memory:"
+
+
+@lru_cache(maxsize=1)
+def get_qdrant_client() -> qdrant_client.QdrantClient:
+    # One pooled client per process (connections are reused across requests)
+    if get_backend() == "qdrant_local":
+        return qdrant_client.QdrantClient(path=os.getenv("QDRANT_PATH", "./data/qdrant_local"))
+    if os.getenv("QDRANT_URL") == ":memory:":
+        return qdrant_client.QdrantClient(location=":memory:")
+    return qdrant_client.QdrantClient(url=os.getenv("QDRANT_URL", "http://localhost:6333"))
+
+
+@lru_cache(maxsize=1)
+def get_async_qdrant_client() -> Optional[qdrant_client.AsyncQdrantClient]:
+    # A second local-mode client would not see the sync client's data, so local mode is sync-only
+    if is_local_mode():
+        return None
+    return qdrant_client.AsyncQdrantClient(url=os.getenv("QDRANT_URL", "http://localhost:6333"))
+
+
+@lru_cache(maxsize=None)
+def get_numpy_store(collection: str):
+    # One instance per collection: it owns the in-memory row map for its files
+    from core_ai.rag_pipeline.indexing.numpy_store import NumpyVectorStore
+
+    return NumpyVectorStore(path=os.path.join(os.getenv("VECTOR_INDEX_DIR", "./data/vector_index"), collection))
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+def quantization_config() -> Optional[models.QuantizationConfig]:
+    """
+    QDRANT_QUANTIZATION: none (default) | scalar | binary.
+    scalar keeps an int8 copy of every vector (4x smaller, near-identical ranking);
+    binary keeps 1 bit per dimension (32x smaller, needs rescoring to keep recall).
+    QDRANT_QUANTIZATION_ALWAYS_RAM pins the quantized copy in RAM while the
+    full-precision vectors can stay on disk (QDRANT_ON_DISK_VECTORS).
+    """
+    kind = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    always_ram = _env_bool("QDRANT_QUANTIZATION_ALWAYS_RAM", "true")
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram
+            )
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=always_ram))
+    if kind not in ("", "none"):
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION: {kind}")
+    return None
+
+
+def hnsw_config() -> models.HnswConfigDiff:
+    """
+    QDRANT_HNSW_M (graph degree, default 16) and QDRANT_HNSW_EF_CONSTRUCT (build-time beam,
+    default 100): higher is better recall for more memory and slower indexing.
+    QDRANT_HNSW_ON_DISK keeps the graph itself on disk.
+    """
+    return models.HnswConfigDiff(
+        m=int(os.getenv("QDRANT_HNSW_M", "16")),
+        ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100")),
+        on_disk=_env_bool("QDRANT_HNSW_ON_DISK", "false"),
+    )
+
+
+def search_params() -> Optional[models.SearchParams]:
+    """
+    Query-time knobs: QDRANT_HNSW_EF (search beam; unset = Qdrant's default) and, on a quantized
+    collection, rescoring of QDRANT_OVERSAMPLING x top_k candidates with the original vectors
+    (QDRANT_RESCORE, default true).
+    """
+    ef = os.getenv("QDRANT_HNSW_EF")
+    quantization = None
+    if os.getenv("QDRANT_QUANTIZATION", "none").lower() not in ("", "none"):
+        quantization = models.QuantizationSearchParams(
+            rescore=_env_bool("QDRANT_RESCORE", "true"),
+            oversampling=float(os.getenv("QDRANT_OVERSAMPLING", "2.0")),
+        )
+    if not ef and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=int(ef) if ef else None, quantization=quantization)
+
+
+# LlamaIndex's default dense vector name: the layout every reader (QdrantVectorStore, batched
+# search with using=dense_vector_name) expects
+DENSE_VECTOR_NAME = "text-dense"
+
+
+def create_collection(
+    client: qdrant_client.QdrantClient, name: str, dim: int, vector_name: str = DENSE_VECTOR_NAME
+) -> None:
+    """
+    Explicit collection layout instead of LlamaIndex's defaults (all in RAM, no quantization):
+    one named cosine vector (QDRANT_ON_DISK_VECTORS), payloads on disk (QDRANT_ON_DISK_PAYLOAD,
+    default true: they are only read for the final top-k), tuned HNSW and optional quantization.
+    Two ingest jobs (tenants of one shared collection) may race to create it; the loser
+    keeps the winner's collection.
+    """
+    try:
+        _create(client, name, dim, vector_name)
+    except Exception:
+        if not client.collection_exists(name):
+            raise
+
+
+def _create(client: qdrant_client.QdrantClient, name: str, dim: int, vector_name: str) -> None:
+    client.create_collection(
+        collection_name=name,
+        vectors_config={
+            vector_name: models.VectorParams(
+                size=dim,
+                distance=models.Distance.COSINE,
+                on_disk=_env_bool("QDRANT_ON_DISK_VECTORS", "false"),
+            )
+        },
+        hnsw_config=hnsw_config(),
+        quantization_config=quantization_config(),
+        on_disk_payload=_env_bool("QDRANT_ON_DISK_PAYLOAD", "true"),
+    )
+    # Delete-by-document filters on doc_id
+    client.create_payload_index(
+        collection_name=name,
+        field_name="doc_id",
+        field_schema=models.PayloadSchemaType.KEYWORD,
+    )
+    # Tenant index: Qdrant co-locates each tenant's points, so filtered search stays fast with
+    # many tenants in one collection
+    client.create_payload_index(
+        collection_name=name,
+        field_name=tenant_field(),
+        field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+    )
+
+
+def payload_fields() -> List[str]:
+    # Metadata copied into slim payloads: what retrieval reads (file name, the chunk metadata
+    # precomputed by chunking.py), the tenant key and any other filter keys
+    default = "file_name,section_title,keywords,step_count"
+    fields = [f.strip() for f in os.getenv("QDRANT_PAYLOAD_FIELDS", default).split(",") if f.strip()]
+    return fields + [tenant_field()] if tenant_field() not in fields else fields
+
+
+def get_text_store(collection: str):
+    """
+    CHUNK_TEXT_STORE=local keeps chunk text in a SQLite file next to the manifest instead of in
+    the Qdrant payload; "payload" (default) keeps it in Qdrant.
+    """
+    if os.getenv("CHUNK_TEXT_STORE", "payload").lower() != "local":
+        return None
+    from core_ai.rag_pipeline.indexing.manifest import collection_state_dir, kb_object
+    from core_ai.rag_pipeline.indexing.qdrant_store import ChunkTextStore
+
+    state_dir = collection_state_dir(collection)
+    return kb_object(state_dir, "text_store", lambda: ChunkTextStore(state_dir / "chunks.sqlite"))
+
+
+def get_vector_store(collection: Optional[str] = None):
+    """
+    Vector store for a collection (default: the current knowledge base). Every store shares the
+    process-wide pooled Qdrant clients.
+    """
+    collection = collection or current_collection()
+    if get_backend() == "numpy":
+        return get_numpy_store(collection)
+    if not _env_bool("QDRANT_SLIM_PAYLOAD", "true"):
+        from llama_index.vector_stores.qdrant import QdrantVectorStore
+
+        return QdrantVectorStore(
+            client=get_qdrant_client(),
+            aclient=get_async_qdrant_client(),
+            collection_name=collection,
+        )
+
+    from core_ai.rag_pipeline.indexing.qdrant_store import SlimQdrantVectorStore
+
+    return SlimQdrantVectorStore(
+        client=get_qdrant_client(),
+        aclient=get_async_qdrant_client(),
+        collection_name=collection,
+        payload_fields=payload_fields(),
+        text_store=get_text_store(collection),
+    )
+
+
+def qdrant_tenant_filter(tenant: Optional[str]) -> models.Filter:
+    # Qdrant form of tenancy.tenant_filters(): one tenant, or untagged points without one
+    if tenant is None:
+        return models.Filter(must=[models.IsEmptyCondition(is_empty=models.PayloadField(key=tenant_field()))])
+    return models.Filter(must=[models.FieldCondition(key=tenant_field(), match=models.MatchValue(value=tenant))])
+
+
+def has_points(store: Any, tenant: Optional[str] = None) -> bool:
+    """
+    True when the store's collection exists and holds at least one point of the tenant (untagged
+    points without one). Ingest checks this so a dropped or wiped collection is refilled even
+    though the manifest still lists its files.
+    """
+    if not hasattr(store, "collection_name"):
+        return store.count() > 0  # numpy backend: one store per collection, no tenant split
+    if not store.client.collection_exists(store.collection_name):
+        return False
+    points, _ = store.client.scroll(
+        collection_name=store.collection_name,
+        scroll_filter=qdrant_tenant_filter(tenant),
+        limit=1,
+        with_payload=False,
+        with_vectors=False,
+    )
+    return bool(points)
+
+
+def migrate_collection(collection: Optional[str] = None, batch_size: int = 256) -> Dict[str, Any]:
+    """
+    Brings an existing collection to the current settings in place, without re-embedding:
+    HNSW / quantization / on-disk parameters are updated (Qdrant rebuilds in the background),
+    then LlamaIndex's full payloads (the serialized node in "_node_content") are rewritten as
+    slim payloads, moving the text into the local text store when CHUNK_TEXT_STORE=local.
+    Also adds the tenant payload index collections created before multi-tenancy lack.
+    """
+    from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+    from core_ai.rag_pipeline.indexing.qdrant_store import slim_payload
+
+    collection = collection or current_collection()
+    client = get_qdrant_client()
+    info = client.get_collection(collection)
+    vectors = info.config.params.vectors
+    vector_name = "" if isinstance(vectors, models.VectorParams) else next(iter(vectors or {}), "")
+
+    client.update_collection(
+        collection_name=collection,
+        vectors_config={vector_name: models.VectorParamsDiff(on_disk=_env_bool("QDRANT_ON_DISK_VECTORS", "false"))},
+        hnsw_config=hnsw_config(),
+        quantization_config=quantization_config() or models.Disabled.DISABLED,
+        collection_params=models.CollectionParamsDiff(on_disk_payload=_env_bool("QDRANT_ON_DISK_PAYLOAD", "true")),
+    )
+    client.create_payload_index(
+        collection_name=collection,
+        field_name=tenant_field(),
+        field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True),
+    )
+
+    fields = payload_fields()
+    text_store = get_text_store(collection)
+    scanned = rewritten = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, limit=batch_size, offset=offset, with_payload=True, with_vectors=False
+        )
+        legacy = [p for p in points if "_node_content" in (p.payload or {})]
+        scanned += len(points)
+        if legacy:
+            nodes = [metadata_dict_to_node(p.payload) for p in legacy]
+            if text_store is not None:
+                text_store.put((str(p.id), n.ref_doc_id, n.get_content()) for p, n in zip(legacy, nodes))
+            client.batch_update_points(
+                collection_name=collection,
+                update_operations=[
+                    models.OverwritePayloadOperation(
+                        overwrite_payload=models.SetPayload(
+                            payload=slim_payload(n, fields, with_text=text_store is None), points=[p.id]
+                        )
+                    )
+                    for p, n in zip(legacy, nodes)
+                ],
+            )
+            rewritten += len(legacy)
+        if offset is None:
+            break
+
+    return {"collection": collection, "points": scanned, "payloads_rewritten": rewritten}
+
+
+def main():
+    p = argparse.ArgumentParser(description="Qdrant collection management")
+    sub = p.add_subparsers(dest="command", required=True)
+    m = sub.add_parser("migrate", help="apply HNSW/quantization/on-disk settings and slim the payloads")
+    m.add_argument("--collection", default=None)
+    m.add_argument("--batch-size", type=int, default=256)
+    args = p.parse_args()
+
+    if args.command == "migrate":
+        print(json.dumps(migrate_collection(args.collection, args.batch_size), indent=2))
+
 
-def get_vector_store():
-    qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
-    collection = os.getenv("QDRANT_COLLECTION", "enterprise_kb")
-    client = qdrant_client.QdrantClient(url=qdrant_url)
-    return QdrantVectorStore(client=client, collection_name=collection)
+if __name__ == "__main__":
+    main()
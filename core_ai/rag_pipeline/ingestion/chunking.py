@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+import html
+import os
+import re
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.schema import BaseNode, MetadataMode
+
+from core_ai.rag_pipeline.retrieval.context import count_tokens
+from core_ai.rag_pipeline.retrieval.relevance import keyword_set
+
+
+# Metadata precomputed for every chunk at ingest time. Stored in the slim Qdrant payload and
+# read back by retrieval (citations, context headers, the low-confidence guard) so nothing is
+# recomputed per request. Keywords / step count are not part of the embedded or prompt text.
+SECTION_KEY = "section_title"
+KEYWORDS_KEY = "keywords"
+STEPS_KEY = "step_count"
+CHUNK_METADATA_KEYS = (SECTION_KEY, KEYWORDS_KEY, STEPS_KEY)
+# Bumped when the precomputed metadata changes meaning, so existing chunks are re-split
+# (2: KEYWORDS_KEY holds every distinct term, no longer the 48 most frequent)
+CHUNK_METADATA_VERSION = 2
+
+_MD_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$")
+_HTML_HEADING = re.compile(r"^\s*<h[1-6][^>]*>(.*?)</h[1-6]>\s*$", re.IGNORECASE)
+_SETEXT_RULE = re.compile(r"^\s{0,3}(=+|-+)\s*$")
+_NUMBERED_ITEM = re.compile(r"^\s*(?:step\s+)?\d{1,3}[.):]\s+\S", re.IGNORECASE)
+_BULLET_ITEM = re.compile(r"^\s*(?:[-*+•]|[a-z][.)])\s+\S")
+_HTML_ITEM = re.compile(r"^\s*<li[\s>]", re.IGNORECASE)
+_HTML_OL = re.compile(r"<(/?)ol[\s>]", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+
+
+def chunk_size() -> int:
+    return int(os.getenv("CHUNK_SIZE", "512"))
+
+
+def chunk_overlap() -> int:
+    return int(os.getenv("CHUNK_OVERLAP", "64"))
+
+
+def chunk_sizes_by_type() -> Dict[str, int]:
+    """
+    CHUNK_SIZES: per file type token budgets, "ext:tokens" pairs (default "pdf:640,docx:640":
+    long-form prose gains from bigger chunks; runbooks and FAQs use CHUNK_SIZE).
+    """
+    sizes: Dict[str, int] = {}
+    for pair in os.getenv("CHUNK_SIZES", "pdf:640,docx:640").split(","):
+        ext, _, tokens = pair.partition(":")
+        if ext.strip() and tokens.strip():
+            sizes[ext.strip().lstrip(".").lower()] = int(tokens)
+    return sizes
+
+
+def chunking_mode() -> str:
+    """CHUNKING=structured (default) or sentence (the previous fixed SentenceSplitter)."""
+    return os.getenv("CHUNKING", "structured").lower()
+
+
+def chunking_signature() -> str:
+    # Recorded in the manifest: a different value means existing chunks were cut differently
+    if chunking_mode() == "sentence":
+        return f"sentence:{chunk_size()}:{chunk_overlap()}"
+    sizes = ",".join(f"{k}:{v}" for k, v in sorted(chunk_sizes_by_type().items()))
+    return f"structured:{chunk_size()}:{chunk_overlap()}:{sizes}:v{CHUNK_METADATA_VERSION}"
+
+
+class _Block:
+    """A run of lines that is never split: heading, list item or paragraph."""
+
+    __slots__ = ("kind", "start", "end", "title", "tokens")
+
+    def __init__(self, kind: str, start: int, end: int, title: str = ""):
+        self.kind = kind  # "heading" | "step" | "bullet" | "para"
+        self.start = start
+        self.end = end
+        self.title = title
+        self.tokens = 0
+
+
+def _heading_title(line: str, next_line: str, kind: str) -> Optional[str]:
+    match = _MD_HEADING.match(line) if kind == "markdown" else None
+    if match:
+        return match.group(1)
+    match = _HTML_HEADING.match(line) if kind == "html" else None
+    if match:
+        return html.unescape(_TAG.sub("", match.group(1))).strip() or None
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80:
+        return None
+    if _SETEXT_RULE.match(next_line) and kind != "html":
+        return stripped
+    # Plain-text conventions: "VPN Troubleshooting Runbook:" or an ALL CAPS title line
+    if _NUMBERED_ITEM.match(line) or _BULLET_ITEM.match(line):
+        return None
+    if stripped.endswith(":") and len(stripped.split()) <= 8:
+        return stripped.rstrip(":").strip()
+    letters = [c for c in stripped if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return stripped
+    return None
+
+
+def _blocks(text: str, kind: str) -> List[_Block]:
+    """Line-level structure: headings, numbered / bulleted items (with continuation lines), paragraphs."""
+    lines = text.splitlines(keepends=True)
+    offsets = []
+    pos = 0
+    for line in lines:
+        offsets.append(pos)
+        pos += len(line)
+
+    blocks: List[_Block] = []
+    current: Optional[_Block] = None
+    skip_rule = False
+    ordered = False  # inside an HTML <ol>: its <li> items are steps
+    for i, line in enumerate(lines):
+        if kind == "html":
+            for closing in _HTML_OL.findall(line):
+                ordered = not closing
+        if skip_rule:
+            skip_rule = False
+            if current is not None:
+                current.end = offsets[i] + len(line)
+            continue
+        start, end = offsets[i], offsets[i] + len(line)
+        if not line.strip():
+            current = None
+            continue
+
+        next_line = lines[i + 1] if i + 1 < len(lines) else ""
+        title = _heading_title(line, next_line, kind)
+        if title is not None:
+            current = _Block("heading", start, end, title)
+            blocks.append(current)
+            skip_rule = bool(_SETEXT_RULE.match(next_line)) and kind != "html"
+            # A heading is its own block; the next line starts a new one
+            current = None
+            continue
+
+        if _NUMBERED_ITEM.match(line):
+            current = _Block("step", start, end)
+            blocks.append(current)
+        elif kind == "html" and _HTML_ITEM.match(line):
+            current = _Block("step" if ordered else "bullet", start, end)
+            blocks.append(current)
+        elif _BULLET_ITEM.match(line):
+            current = _Block("bullet", start, end)
+            blocks.append(current)
+        elif current is not None:
+            # Continuation of the paragraph or list item above (wrapped line, sub-text)
+            current.end = end
+        else:
+            current = _Block("para", start, end)
+            blocks.append(current)
+    return blocks
+
+
+def _document_kind(doc: BaseNode) -> Tuple[str, str]:
+    meta = doc.metadata or {}
+    name = str(meta.get("file_name") or meta.get("file_path") or "")
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    if ext in ("md", "markdown"):
+        return "markdown", ext
+    if ext in ("html", "htm"):
+        return "html", ext
+    return "text", ext
+
+
+def _plain(text: str, kind: str) -> str:
+    # Keywords come from the visible text, not tag names or entities
+    return html.unescape(_TAG.sub(" ", text)) if kind == "html" else text
+
+
+class StructuredSplitter(NodeParser):
+    """
+    Structure-aware chunking: documents are cut along headings, list items and paragraphs, never
+    inside a numbered runbook step, and sized by token count per file type (CHUNK_SIZE /
+    CHUNK_SIZES). A section starts a new chunk once the current one is a quarter full; a list
+    moves to a fresh chunk rather than straddle two, and is only split between items when it is
+    larger than a whole chunk. Only a single paragraph longer than a chunk falls back to the
+    sentence splitter (with CHUNK_OVERLAP), so structural boundaries need no overlap.
+
+    Every chunk gets SECTION_KEY, KEYWORDS_KEY (every distinct normalized term of the section
+    title and the chunk: the relevance guard checks coverage against the full set, so a rare
+    term is never cut off) and STEPS_KEY metadata. Chunk texts are exact substrings of the document,
+    so character spans (context merging) still work.
+    """
+
+    chunk_size: int = Field(default=512, description="Default token budget per chunk.")
+    chunk_overlap: int = Field(default=64, description="Overlap when an oversized paragraph is sentence-split.")
+    sizes_by_type: Dict[str, int] = Field(default_factory=dict, description="Token budget per file extension.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "StructuredSplitter"
+
+    def size_for(self, ext: str) -> int:
+        return self.sizes_by_type.get(ext, self.chunk_size)
+
+    def _parse_nodes(self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any) -> List[BaseNode]:
+        out: List[BaseNode] = []
+        for doc in nodes:
+            text = doc.get_content(metadata_mode=MetadataMode.NONE)
+            kind, ext = _document_kind(doc)
+            chunks = self.split_structured(text, kind, self.size_for(ext))
+            built = build_nodes_from_splits([c[0] for c in chunks], doc, id_func=self.id_func)
+            for node, (chunk_text, section, steps) in zip(built, chunks):
+                node.metadata[SECTION_KEY] = section
+                node.metadata[STEPS_KEY] = steps
+                terms = keyword_set(section) + keyword_set(_plain(chunk_text, kind))
+                node.metadata[KEYWORDS_KEY] = list(dict.fromkeys(terms))
+                # Own lists: build_nodes_from_splits shares the document's lists between nodes
+                node.excluded_embed_metadata_keys = [*doc.excluded_embed_metadata_keys, KEYWORDS_KEY, STEPS_KEY]
+                node.excluded_llm_metadata_keys = [*doc.excluded_llm_metadata_keys, *CHUNK_METADATA_KEYS]
+            out.extend(built)
+        return out
+
+    def split_structured(self, text: str, kind: str, size: int) -> List[Tuple[str, str, int]]:
+        """Returns (chunk text, section title, numbered steps in the chunk) in document order."""
+        blocks = _blocks(text, kind)
+        for block in blocks:
+            block.tokens = count_tokens(text[block.start : block.end])
+
+        chunks: List[Tuple[str, str, int]] = []
+        current: List[_Block] = []
+        used = 0
+        section = ""
+        chunk_section = ""
+
+        def flush() -> None:
+            nonlocal current, used
+            body = [b for b in current if b.kind != "heading"]
+            # Headings left without a body (end of document) only matter if nothing else was kept
+            if body or (current and not chunks):
+                chunk = text[current[0].start : current[-1].end].strip()
+                chunks.append((chunk, chunk_section, sum(1 for b in body if b.kind == "step")))
+            current, used = [], 0
+
+        def has_body() -> bool:
+            return any(b.kind != "heading" for b in current)
+
+        def add(group: List[_Block]) -> None:
+            nonlocal used, chunk_section
+            if not current:
+                chunk_section = section
+            current.extend(group)
+            used += sum(b.tokens for b in group)
+
+        i = 0
+        while i < len(blocks):
+            block = blocks[i]
+
+            if block.kind == "heading":
+                if used >= size // 4:
+                    flush()
+                section = block.title
+                if not has_body():
+                    # Heading(s) only so far: the chunk belongs to the newest section
+                    chunk_section = section
+                add([block])
+                i += 1
+                continue
+
+            # A list (consecutive items) is placed as a unit when it fits a chunk
+            j = i + 1
+            if block.kind in ("step", "bullet"):
+                while j < len(blocks) and blocks[j].kind in ("step", "bullet"):
+                    j += 1
+            group = blocks[i:j]
+            cost = sum(b.tokens for b in group)
+
+            if used + cost <= size:
+                add(group)
+            elif cost <= size:
+                # Start a fresh chunk for the list, keeping a pending heading with it
+                if has_body():
+                    flush()
+                add(group)
+            else:
+                for item in group:
+                    if item.tokens > size:
+                        self._split_oversized(text, item, size, flush, chunks, section)
+                        continue
+                    if used + item.tokens > size and has_body():
+                        flush()
+                    add([item])
+            i = j
+
+        flush()
+        return chunks
+
+    def _split_oversized(
+        self,
+        text: str,
+        block: _Block,
+        size: int,
+        flush: Callable[[], None],
+        chunks: List[Tuple[str, str, int]],
+        section: str,
+    ) -> None:
+        flush()
+        splitter = SentenceSplitter(chunk_size=size, chunk_overlap=min(self.chunk_overlap, size // 4))
+        steps = 1 if block.kind == "step" else 0
+        for piece in splitter.split_text(text[block.start : block.end]):
+            chunks.append((piece, section, steps))
+
+
+def get_structured_splitter(id_func: Optional[Callable[[int, Any], str]] = None) -> StructuredSplitter:
+    return StructuredSplitter(
+        chunk_size=chunk_size(),
+        chunk_overlap=chunk_overlap(),
+        sizes_by_type=chunk_sizes_by_type(),
+        id_func=id_func,
+    )
+
+
+def chunk_keywords(metadata: Dict[str, Any]) -> Optional[FrozenSet[str]]:
+    """Keyword set precomputed at ingest; None for chunks indexed before structured chunking."""
+    keywords = (metadata or {}).get(KEYWORDS_KEY)
+    return frozenset(keywords) if isinstance(keywords, (list, tuple, set, frozenset)) else None
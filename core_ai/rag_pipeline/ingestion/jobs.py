@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core_ai.rag_pipeline.indexing.index_manager import ingest_directory
+from core_ai.rag_pipeline.indexing.tenancy import default_collection, use_kb
+
+
+MAX_JOB_HISTORY = 50
+
+
+class JobConflict(Exception):
+    """Raised when an ingest job is already running for the knowledge base."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Ingest job {job_id} is already running for this knowledge base")
+        self.job_id = job_id
+
+
+class IngestJob:
+    def __init__(
+        self,
+        data_dir: str,
+        collection: str,
+        on_complete: Optional[Callable[[], Any]] = None,
+        tenant: Optional[str] = None,
+    ):
+        self.id = uuid.uuid4().hex
+        self.data_dir = data_dir
+        self.collection = collection
+        self.tenant = tenant
+        self.on_complete = on_complete
+        self.status = "queued"  # queued | running | completed | cancelled | failed
+        self.progress: Dict[str, Any] = {"files_total": 0, "files": 0, "documents": 0, "chunks": 0}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        elapsed = (end - self.started_at) if self.started_at else 0.0
+
+        files_done = self.progress.get("files", 0)
+        files_total = self.progress.get("files_total", 0)
+        files_per_s = files_done / elapsed if elapsed > 0 else 0.0
+        chunks_per_s = self.progress.get("chunks", 0) / elapsed if elapsed > 0 else 0.0
+
+        eta_s = None
+        if self.status == "running" and files_per_s > 0:
+            eta_s = round(max(0, files_total - files_done) / files_per_s, 1)
+
+        return {
+            "job_id": self.id,
+            "collection": self.collection,
+            "tenant": self.tenant,
+            "status": self.status,
+            "files_total": files_total,
+            "files_processed": files_done,
+            "documents": self.progress.get("documents", 0),
+            "chunks_embedded": self.progress.get("chunks", 0),
+            "elapsed_s": round(elapsed, 1),
+            "files_per_s": round(files_per_s, 2),
+            "chunks_per_s": round(chunks_per_s, 2),
+            "eta_s": eta_s,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+_lock = threading.Lock()
+_jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+_active: Dict[Tuple[str, Optional[str]], str] = {}  # (collection, tenant) -> running job id
+
+
+def _run(job: IngestJob) -> None:
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        # The thread does not inherit the caller's context: select the job's knowledge base here
+        with use_kb(job.collection, job.tenant):
+            job.result = ingest_directory(
+                job.data_dir,
+                on_progress=job.progress.update,
+                should_stop=job.cancel_event.is_set,
+            )
+            if job.on_complete and not job.result.get("cancelled"):
+                job.result["post_ingest"] = job.on_complete()
+        job.status = "cancelled" if job.result.get("cancelled") else "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+        with _lock:
+            _active.pop((job.collection, job.tenant), None)
+
+
+def start_ingest_job(
+    data_dir: str,
+    collection: Optional[str] = None,
+    on_complete: Optional[Callable[[], Any]] = None,
+    tenant: Optional[str] = None,
+) -> IngestJob:
+    """
+    Start a background ingest. At most one job runs per knowledge base (collection, tenant);
+    a second request raises JobConflict carrying the running job's ID.
+    on_complete runs in the job thread after a successful ingest; its return value is
+    reported as result["post_ingest"].
+    """
+    collection = collection or default_collection()
+
+    with _lock:
+        running = _active.get((collection, tenant))
+        if running:
+            raise JobConflict(running)
+
+        job = IngestJob(data_dir, collection, on_complete, tenant)
+        _active[(collection, tenant)] = job.id
+        _jobs[job.id] = job
+
+        # Bounded history: forget the oldest finished jobs
+        while len(_jobs) > MAX_JOB_HISTORY:
+            oldest = next(iter(_jobs))
+            if _jobs[oldest].finished_at is None:
+                break
+            _jobs.pop(oldest)
+
+    threading.Thread(target=_run, args=(job,), name=f"ingest-{job.id[:8]}", daemon=True).start()
+    return job
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    return _jobs.get(job_id)
+
+
+def cancel_job(job_id: str) -> Optional[IngestJob]:
+    """
+    Cooperative cancel: the pipeline stops after the file it is working on.
+    """
+    job = _jobs.get(job_id)
+    if job and job.finished_at is None:
+        job.cancel_event.set()
+    return job
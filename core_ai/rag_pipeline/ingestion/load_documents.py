@@ -1,7 +1,293 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
 from llama_index.core import SimpleDirectoryReader
 
-def load_documents(data_dir: str):
+from core_ai.observability.metrics import record_stage
+
+
+DEFAULT_EXTENSIONS = "*"
+
+# How often the parent checks which parses have started while a timeout is set
+_START_POLL_S = 0.2
+
+
+def allowed_extensions() -> Optional[Set[str]]:
+    """INGEST_EXTENSIONS: comma-separated suffixes to ingest ("*" = every file)."""
+    raw = os.getenv("INGEST_EXTENSIONS", DEFAULT_EXTENSIONS).strip()
+    if raw == "*":
+        return None
+    return {("." + e.strip().lstrip(".")).lower() for e in raw.split(",") if e.strip()}
+
+
+def max_file_bytes() -> Optional[int]:
+    """INGEST_MAX_FILE_MB (default 100, 0 = no limit): larger files are not ingested."""
+    mb = float(os.getenv("INGEST_MAX_FILE_MB", "100"))
+    return int(mb * 1024 * 1024) if mb > 0 else None
+
+
+def parse_timeout() -> Optional[float]:
+    """INGEST_PARSE_TIMEOUT_S (default 120, 0 = none): per-file parse time limit."""
+    seconds = float(os.getenv("INGEST_PARSE_TIMEOUT_S", "120"))
+    return seconds if seconds > 0 else None
+
+
+def parse_workers() -> int:
+    return max(1, int(os.getenv("INGEST_PARSE_WORKERS", str(min(4, os.cpu_count() or 1)))))
+
+
+def iter_files(data_dir: str) -> Iterator[Tuple[str, Path, os.stat_result]]:
+    """
+    Lazily walks data_dir in a stable order and yields (relative posix path, absolute path, stat)
+    for every non-hidden file that passes the extension and size filters.
+    """
+    root = Path(data_dir)
+    if not root.is_dir():
+        return
+    extensions = allowed_extensions()
+    limit = max_file_bytes()
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        # Prune hidden directories in place so os.walk never descends into them
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if name.startswith("."):
+                continue
+            if extensions is not None and Path(name).suffix.lower() not in extensions:
+                continue
+            path = Path(dirpath, name)
+            st = path.stat()
+            if limit is not None and st.st_size > limit:
+                continue
+            yield path.relative_to(root).as_posix(), path.resolve(), st
+
+
+def parse_file(path: str) -> List[Any]:
+    # Top-level function so it can run in a worker process (same readers as SimpleDirectoryReader)
+    return SimpleDirectoryReader(input_files=[path]).load_data()
+
+
+# Parser processes report (task, pid) here when they pick up a file, so the parent can time
+# each parse from its actual start (not from when it was queued) and kill the process running it
+_starts: Any = None
+
+
+def _init_worker(starts: Any) -> None:
+    global _starts
+    _starts = starts
+
+
+def _timed_parse(task: int, path: str) -> Tuple[float, List[Any]]:
+    # Timed inside the worker so the "load" stage excludes queueing in the pool
+    _starts.put((task, os.getpid()))
+    start = time.perf_counter()
+    documents = parse_file(path)
+    return time.perf_counter() - start, documents
+
+
+def _kill(pid: int) -> None:
+    try:
+        os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+    except OSError:
+        pass  # already gone
+
+
+def _mp_context() -> Any:
+    """
+    Never the Linux default "fork": the API process is multithreaded (uvicorn, warmup, ingest
+    job) with torch/ONNX loaded, and a forked child can deadlock on a lock another thread held
+    at fork time. "forkserver" forks workers from a clean single-threaded server that has this
+    module (and so the readers) preloaded; "spawn" where that is unavailable. Either way workers
+    get their state only through _init_worker/initargs.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+class _ParserPool:
+    """
+    Process pool plus the start reports of its workers. Parsing always happens in these
+    processes, never in the caller: a timeout is enforced by killing the process (which also
+    works while the parser is inside C code), after which the pool is replaced.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._open()
+
+    def _open(self) -> None:
+        ctx = _mp_context()
+        self.starts = ctx.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=ctx, initializer=_init_worker, initargs=(self.starts,)
+        )
+        self.running: Dict[int, Tuple[int, float]] = {}  # task -> (pid, start time in this process)
+
+    def submit(self, task: int, path: str) -> Future:
+        return self.executor.submit(_timed_parse, task, path)
+
+    def poll_starts(self) -> None:
+        while not self.starts.empty():
+            task, pid = self.starts.get()
+            self.running[task] = (pid, time.monotonic())
+
+    def kill(self, tasks: Iterable[int]) -> None:
+        for task in tasks:
+            if task in self.running:
+                _kill(self.running[task][0])
+
+    def replace(self) -> None:
+        """Drop a broken (or deliberately killed) pool and start a fresh one."""
+        self.kill(list(self.running))
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._open()
+
+    def close(self, unfinished: Iterable[int]) -> None:
+        # Parses still in flight (consumer stopped early) are killed rather than waited for
+        self.poll_starts()
+        self.kill(unfinished)
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_parsed(
+    paths: Iterable[Tuple[str, str]],
+    workers: int,
+    timeout: Optional[float] = None,
+    isolated: bool = False,
+) -> Iterator[Tuple[str, List[Any], Optional[str]]]:
+    """
+    Yields (rel_path, documents, error) as files finish parsing; error is None on success and a
+    short reason otherwise (documents is then empty). A file that fails never stops the others.
+
+    Files are always parsed in worker processes (even with workers=1), and the per-file timeout
+    is enforced from here: a parse running longer is reported as timed out, its process killed
+    and the pool recreated; the other files that were in flight are resubmitted.
+
+    paths is consumed lazily and at most 2 * workers files are in flight, so parsed-but-unconsumed
+    documents stay bounded. If a parser process dies (segfault, OOM kill) every file that was in
+    flight is re-parsed alone in a fresh process, so only the culprit is reported as failed.
+    """
+    items = iter(paths)
+    window = workers * 2
+    pool = _ParserPool(workers)
+    pending: Dict[Future, Tuple[int, str, str]] = {}
+    tasks = itertools.count()
+
+    def outcome(rel: str, fut: Future) -> Tuple[str, List[Any], Optional[str]]:
+        try:
+            elapsed, documents = fut.result()
+        except BrokenProcessPool:
+            return rel, [], "parser process died"
+        except Exception as e:
+            return rel, [], f"{type(e).__name__}: {e}"
+        record_stage("load", elapsed, pipeline="ingest")
+        return rel, documents, None
+
+    try:
+        while True:
+            while len(pending) < window:
+                nxt = next(items, None)
+                if nxt is None:
+                    break
+                task = next(tasks)
+                pending[pool.submit(task, nxt[1])] = (task, *nxt)
+            if not pending:
+                break
+
+            wait_s = None
+            if timeout is not None:
+                # Poll for start reports; otherwise sleep until the oldest running parse expires
+                pool.poll_starts()
+                started = [pool.running[t][1] for t, _, _ in pending.values() if t in pool.running]
+                wait_s = min([_START_POLL_S] + [s + timeout - time.monotonic() for s in started])
+            done, _ = wait(pending, timeout=max(0.0, wait_s) if wait_s is not None else None, return_when=FIRST_COMPLETED)
+
+            if any(isinstance(fut.exception(), BrokenProcessPool) for fut in done):
+                # Every future of a broken pool fails: isolate them, then carry on with a new pool
+                suspects = [(rel, path) for _, rel, path in pending.values()]
+                pending.clear()
+                pool.replace()
+                for rel, path in suspects:
+                    if isolated:
+                        yield rel, [], "parser process died"
+                    else:
+                        yield from iter_parsed([(rel, path)], 1, timeout, isolated=True)
+                continue
+
+            for fut in done:
+                task, rel, _ = pending.pop(fut)
+                pool.running.pop(task, None)
+                yield outcome(rel, fut)
+
+            if timeout is None:
+                continue
+            now = time.monotonic()
+            expired = [
+                fut for fut, (task, _, _) in pending.items()
+                if task in pool.running and now - pool.running[task][1] >= timeout and not fut.done()
+            ]
+            if expired:
+                for fut in expired:
+                    _, rel, _ = pending.pop(fut)
+                    yield rel, [], f"timeout after {timeout:g}s"
+                for fut in [f for f in pending if f.done()]:
+                    _, rel, _ = pending.pop(fut)
+                    yield outcome(rel, fut)
+                # Killing a worker breaks the whole pool: resubmit the innocent files to a new one
+                survivors = [(rel, path) for _, rel, path in pending.values()]
+                pending.clear()
+                pool.replace()
+                for rel, path in survivors:
+                    task = next(tasks)
+                    pending[pool.submit(task, path)] = (task, rel, path)
+    finally:
+        pool.close(task for task, _, _ in pending.values())
+
+
+def iter_documents(
+    data_dir: str,
+    manifest: Optional[Dict[str, Any]] = None,
+    workers: Optional[int] = None,
+    on_error: Optional[Callable[[str, str], None]] = None,
+) -> Iterator[Any]:
+    """
+    Lazy loader: walks data_dir (extension / size filters), skips files the manifest already
+    has with the same size and mtime, parses the rest in a process pool and yields LlamaIndex
+    documents file by file as they are ready, so callers can split and embed while later files
+    are still parsing. Files that fail or time out are reported to on_error(rel_path, reason).
+    """
+    known = (manifest or {}).get("files", {})
+
+    def changed() -> Iterator[Tuple[str, str]]:
+        for rel, path, st in iter_files(data_dir):
+            old = known.get(rel)
+            if old and old.get("size") == st.st_size and old.get("mtime") == st.st_mtime:
+                continue
+            yield rel, str(path)
+
+    for rel, documents, error in iter_parsed(changed(), workers or parse_workers(), parse_timeout()):
+        if error is not None:
+            if on_error:
+                on_error(rel, error)
+            continue
+        yield from documents
+
+
+def load_documents(data_dir: str) -> List[Any]:
     """
     Reads files (PDF/TXT/MD/HTML) from a folder and returns LlamaIndex documents.
+    Everything ends up in memory; use iter_documents() to stream instead.
     """
-    return SimpleDirectoryReader(data_dir, recursive=True).load_data()
+    return list(iter_documents(data_dir))
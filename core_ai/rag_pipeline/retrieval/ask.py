@@ -1,21 +1,203 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+from core_ai.observability.metrics import record_stage, stage
+from core_ai.rag_pipeline.indexing.embeddings import get_embed_model, get_query_embedding_batch
 from core_ai.rag_pipeline.indexing.index_manager import get_index
+from core_ai.rag_pipeline.indexing.sparse_index import get_sparse_index, rrf_fuse
+from core_ai.rag_pipeline.indexing.tenancy import current_collection, current_tenant, tenant_filters
+from core_ai.rag_pipeline.indexing.vector_store import get_async_qdrant_client
 from core_ai.rag_pipeline.generation.llm_client import get_llm
+from core_ai.rag_pipeline.generation.prompts import render_prompt
+from core_ai.rag_pipeline.ingestion.chunking import SECTION_KEY, STEPS_KEY, chunk_keywords
+from core_ai.rag_pipeline.retrieval.batching import batching_enabled, get_embed_batcher, get_search_batcher
+from core_ai.rag_pipeline.retrieval.cache import (
+    get_cached_answer,
+    query_embedding_cache,
+    set_cached_answer,
+)
+from core_ai.rag_pipeline.retrieval.context import make_snippet, pack_context
+from core_ai.rag_pipeline.retrieval.rerank import rerank, rerank_candidates, rerank_enabled
+
+
+# Set by batch_scope() for bulk answering; unset (None) for single requests
+_shared_retrievals: ContextVar[Optional[Dict[Tuple[Any, ...], "asyncio.Future"]]] = ContextVar(
+    "ekc_shared_retrievals", default=None
+)
+_llm_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("ekc_llm_slots", default=None)
+
+
+@contextmanager
+def batch_scope(llm_concurrency: int) -> Iterator[None]:
+    """
+    Scope for many questions answered concurrently (asyncio tasks created inside inherit it):
+    identical retrieval queries (agents rewrite to the same canned queries) share one search,
+    and at most llm_concurrency LLM generations run at a time.
+    """
+    tokens = (_shared_retrievals.set({}), _llm_slots.set(asyncio.Semaphore(max(1, llm_concurrency))))
+    try:
+        yield
+    finally:
+        _shared_retrievals.reset(tokens[0])
+        _llm_slots.reset(tokens[1])
+
+
+@asynccontextmanager
+async def _llm_slot() -> AsyncIterator[None]:
+    slots = _llm_slots.get()
+    if slots is None:
+        yield
+        return
+    async with slots:
+        yield
+
+
+def _compute_query_embedding(key: str) -> List[float]:
+    with stage("embed"):
+        embedding = get_embed_model().get_query_embedding(key)
+    query_embedding_cache.set(key, embedding)
+    return embedding
+
+
+def embed_query(question: str) -> List[float]:
+    """
+    Query embedding through the LRU/TTL cache (agents rewrite many questions to the same
+    canned retrieval queries, so hit rates are high).
+    """
+    key = (question or "").strip()
+    cached = query_embedding_cache.get(key)
+    return cached if cached is not None else _compute_query_embedding(key)
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Uncached batch embedding (router seed utterances and other small fixed sets)."""
+    return get_embed_model().get_text_embedding_batch(texts)
+
+
+def embed_queries(questions: List[str]) -> List[List[float]]:
+    """
+    Cached query embeddings for many questions: misses go through the model in one forward pass.
+    """
+    keys = [(q or "").strip() for q in questions]
+    out: List[Optional[List[float]]] = [query_embedding_cache.get(k) for k in keys]
+    misses = list(dict.fromkeys(k for k, e in zip(keys, out) if e is None))
+    if misses:
+        with stage("embed"):
+            vectors = get_query_embedding_batch(misses)
+        computed = dict(zip(misses, vectors))
+        for k, embedding in computed.items():
+            query_embedding_cache.set(k, embedding)
+        out = [e if e is not None else computed[k] for k, e in zip(keys, out)]
+    return out
+
+
+async def aembed_query(question: str) -> List[float]:
+    """
+    Async embed_query(): cache hits return immediately; misses run the CPU-bound model in a
+    worker thread so the event loop keeps serving other requests.
+    """
+    key = (question or "").strip()
+    cached = query_embedding_cache.get(key)
+    if cached is not None:
+        return cached
+    return await asyncio.to_thread(_compute_query_embedding, key)
+
 
+def _hybrid_enabled() -> bool:
+    return os.getenv("HYBRID_SEARCH", "true").lower() == "true"
 
-def ask_question(question: str, top_k: int = 4) -> dict:
+
+def _dense_top_k(top_k: int) -> int:
+    # Hybrid over-fetches dense candidates so fusion has something to re-rank
+    if not _hybrid_enabled():
+        return top_k
+    return top_k * max(1, int(os.getenv("HYBRID_CANDIDATES", "3")))
+
+
+def _fusion_plan(question: str, dense: List[NodeWithScore], top_k: int) -> Tuple[List[str], List[str]]:
+    """
+    Fuse dense and BM25 rankings with RRF.
+    Returns (top_k fused chunk IDs, IDs that only BM25 found and still need to be fetched).
+    """
+    dense_ids = [n.node.node_id for n in dense]
+    with stage("sparse"):
+        sparse = get_sparse_index().search(question, max(len(dense_ids), top_k))
+    if not sparse:
+        return dense_ids[:top_k], []
+
+    fused = rrf_fuse([dense_ids, [chunk_id for chunk_id, _ in sparse]], k=int(os.getenv("RRF_K", "60")))
+    ids = [chunk_id for chunk_id, _ in fused[:top_k]]
+    seen = set(dense_ids)
+    return ids, [chunk_id for chunk_id in ids if chunk_id not in seen]
+
+
+def _cosine(a: List[float], b: Optional[List[float]]) -> Optional[float]:
+    if not b:
+        return None
+    va, vb = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    return float(va @ vb / (np.linalg.norm(va) * np.linalg.norm(vb) + 1e-12))
+
+
+def _assemble(
+    ids: List[str],
+    dense: List[NodeWithScore],
+    fetched: List[Any],
+    embedding: List[float],
+) -> List[NodeWithScore]:
+    # "score" stays a cosine similarity for every source, so MIN_SOURCE_SCORE keeps its meaning
+    by_id = {n.node.node_id: n for n in dense}
+    for node in fetched:
+        by_id[node.node_id] = NodeWithScore(node=node, score=_cosine(embedding, node.embedding))
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def retrieve_context(question: str, top_k: int = 4) -> Dict[str, Any]:
+    """
+    Retrieval phase only (no LLM call).
+    Returns {"question", "sources", "chunk_ids", "embedding"} for generate_answer()/stream_answer().
+    Dense results are fused with BM25 (exact tokens: error codes, SSIDs, product names)
+    unless HYBRID_SEARCH=false. With RERANK_ENABLED=true, RERANK_CANDIDATES are retrieved and a
+    cross-encoder picks the final top_k.
+    Searches the current knowledge base (tenancy.use_kb), filtered to its tenant if any.
+    """
     index = get_index()
-    llm = get_llm()
 
-    # 1) explicit retrieval
-    retriever = index.as_retriever(similarity_top_k=top_k)
-    nodes = retriever.retrieve(question)
+    # Embedding comes from the cache when possible
+    embedding = embed_query(question)
+    pool = rerank_candidates(top_k)
+    retriever = index.as_retriever(similarity_top_k=_dense_top_k(pool), filters=tenant_filters())
+    with stage("search"):
+        nodes = retriever.retrieve(QueryBundle(query_str=question, embedding=embedding))
+
+    if _hybrid_enabled():
+        ids, missing = _fusion_plan(question, nodes, pool)
+        fetched = index.vector_store.get_nodes(node_ids=missing) if missing else []
+        nodes = _assemble(ids, nodes, fetched, embedding)
+
+    return _to_retrieval(question, rerank(question, nodes[:pool], top_k), embedding)
 
-    # Build sources from retrieved nodes
+
+def _to_retrieval(question: str, nodes: List[Any], embedding: List[float]) -> Dict[str, Any]:
+    # Sources carry short citation snippets; "chunks" keeps the full text (and position in the
+    # source document) for the token-budgeted LLM context built by pack_context().
+    # Section title, step count and keywords were precomputed at ingest (chunking.py);
+    # "keywords" is None when any chunk predates them, so the guards fall back to the text.
     sources = []
-    for n in nodes[:top_k]:
+    chunks = []
+    chunk_ids = []
+    keywords: Optional[FrozenSet[str]] = frozenset()
+    for n in nodes:
         meta = n.node.metadata or {}
         file_name = meta.get("file_name") or meta.get("filename") or "unknown"
         score = getattr(n, "score", None)
+        chunk_ids.append(n.node.node_id)
 
         try:
             text = n.node.get_content()
@@ -23,36 +205,235 @@ def ask_question(question: str, top_k: int = 4) -> dict:
             text = getattr(n.node, "text", "")
 
         text = text or ""
-        snippet = (text[:240] + "...") if len(text) > 240 else text
 
-        sources.append(
-            {"file": file_name, "score": score, "snippet": snippet}
+        source = {"file": file_name, "score": score, "snippet": make_snippet(text)}
+        if meta.get(SECTION_KEY):
+            source["section"] = meta[SECTION_KEY]
+        if meta.get(STEPS_KEY):
+            source["steps"] = meta[STEPS_KEY]
+        sources.append(source)
+        chunks.append(
+            {
+                "file": file_name,
+                "section": meta.get(SECTION_KEY) or "",
+                "text": text,
+                "doc_id": n.node.ref_doc_id,
+                "start": n.node.start_char_idx,
+                "end": n.node.end_char_idx,
+            }
+        )
+
+        terms = chunk_keywords(meta)
+        keywords = keywords | terms if keywords is not None and terms is not None else None
+
+    return {
+        "question": question,
+        "sources": sources,
+        "chunks": chunks,
+        "chunk_ids": chunk_ids,
+        "keywords": keywords,
+        "embedding": embedding,
+    }
+
+
+async def aretrieve_context(question: str, top_k: int = 4) -> Dict[str, Any]:
+    """
+    Async retrieve_context(). With QUERY_BATCHING (default) concurrent requests are coalesced:
+    embeddings that miss the cache are computed in one model call and dense searches go to
+    Qdrant as one batch query. Otherwise the search goes through the pooled AsyncQdrantClient,
+    or a worker thread in Qdrant local mode (no async client).
+    Inside batch_scope(), identical queries against the same knowledge base run once.
+    """
+    shared = _shared_retrievals.get()
+    if shared is None:
+        return await _aretrieve_context(question, top_k)
+
+    key = ((question or "").strip(), top_k, current_collection(), current_tenant())
+    task = shared.get(key)
+    if task is None:
+        task = shared[key] = asyncio.ensure_future(_aretrieve_context(question, top_k))
+    # Callers own their copy: the orchestrator and agents may add keys to it
+    return dict(await asyncio.shield(task))
+
+
+async def _aretrieve_context(question: str, top_k: int) -> Dict[str, Any]:
+    if batching_enabled():
+        return await _aretrieve_batched(question, top_k)
+    if get_async_qdrant_client() is None:
+        return await asyncio.to_thread(retrieve_context, question, top_k)
+
+    index = get_index()
+    embedding = await aembed_query(question)
+    pool = rerank_candidates(top_k)
+    retriever = index.as_retriever(similarity_top_k=_dense_top_k(pool), filters=tenant_filters())
+    with stage("search"):
+        nodes = await retriever.aretrieve(QueryBundle(query_str=question, embedding=embedding))
+    return await _afinish(question, index, nodes, embedding, pool, top_k)
+
+
+async def _aretrieve_batched(question: str, top_k: int) -> Dict[str, Any]:
+    index = get_index()
+    key = (question or "").strip()
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        with stage("embed_wait"):
+            embedding = await get_embed_batcher().asubmit(key)
+
+    pool = rerank_candidates(top_k)
+    with stage("search"):
+        nodes = await get_search_batcher().asubmit(
+            (index.vector_store, embedding, _dense_top_k(pool), current_tenant())
         )
+    return await _afinish(question, index, nodes, embedding, pool, top_k)
+
+
+async def _afinish(
+    question: str, index: Any, nodes: List[NodeWithScore], embedding: List[float], pool: int, top_k: int
+) -> Dict[str, Any]:
+    # Hybrid fusion and optional rerank after the dense search
+    if _hybrid_enabled():
+        ids, missing = _fusion_plan(question, nodes, pool)
+        fetched = []
+        if missing:
+            if get_async_qdrant_client() is None:
+                fetched = await asyncio.to_thread(index.vector_store.get_nodes, node_ids=missing)
+            else:
+                fetched = await index.vector_store.aget_nodes(node_ids=missing)
+        nodes = _assemble(ids, nodes, fetched, embedding)
+
+    nodes = nodes[:pool]
+    if rerank_enabled():
+        # CPU-bound cross-encoder: keep it off the event loop
+        nodes = await asyncio.to_thread(rerank, question, nodes, top_k)
+    return _to_retrieval(question, nodes[:top_k], embedding)
+
+
+def build_prompt(question: str, retrieval: Dict[str, Any], template: str = "kb_answer") -> str:
+    with stage("prompt"):
+        return render_prompt(template, question, pack_context(retrieval["chunks"]))
+
+
+def _answer_inputs(
+    retrieval: Dict[str, Any], question: Optional[str], template: str
+) -> Tuple[str, str, Optional[List[float]]]:
+    """
+    (question for the prompt, answer-cache key, embedding for semantic cache lookups).
+    The prompt gets the user's question even when retrieval used a rewritten query; the
+    template is part of the key because the same chunks answer a ticket request differently.
+    Semantic lookups compare retrieval embeddings, so they only apply when the retrieval query
+    is the question itself.
+    """
+    question = question or retrieval["question"]
+    embedding = retrieval["embedding"] if question == retrieval["question"] else None
+    return question, f"{template}: {question}", embedding
+
+
+def generate_answer(
+    retrieval: Dict[str, Any], question: Optional[str] = None, template: str = "kb_answer"
+) -> str:
+    """
+    Generation phase: full LLM completion over the retrieved context.
+    """
+    question, key, embedding = _answer_inputs(retrieval, question, template)
+    chunk_ids = retrieval["chunk_ids"]
+
+    # Same question + same retrieved chunks + same index version -> same answer
+    cached = get_cached_answer(key, chunk_ids, embedding)
+    if cached is not None:
+        return cached
+
+    prompt = build_prompt(question, retrieval, template)
+    with stage("llm"):
+        response = get_llm().complete(prompt)
+    answer = str(response)
+    set_cached_answer(key, chunk_ids, answer, embedding)
+    return answer
+
+
+def stream_answer(
+    retrieval: Dict[str, Any], question: Optional[str] = None, template: str = "kb_answer"
+) -> Iterator[str]:
+    """
+    Generation phase, token by token (LlamaIndex streaming completion).
+    A cached answer is yielded as a single chunk.
+    """
+    question, key, embedding = _answer_inputs(retrieval, question, template)
+    chunk_ids = retrieval["chunk_ids"]
+
+    cached = get_cached_answer(key, chunk_ids, embedding)
+    if cached is not None:
+        yield cached
+        return
+
+    prompt = build_prompt(question, retrieval, template)
+    parts: List[str] = []
+    start = time.perf_counter()
+    for chunk in get_llm().stream_complete(prompt):
+        if chunk.delta:
+            if not parts:
+                record_stage("llm_first_token", time.perf_counter() - start)
+            parts.append(chunk.delta)
+            yield chunk.delta
+    record_stage("llm", time.perf_counter() - start)
+
+    set_cached_answer(key, chunk_ids, "".join(parts), embedding)
+
+
+async def agenerate_answer(
+    retrieval: Dict[str, Any], question: Optional[str] = None, template: str = "kb_answer"
+) -> str:
+    question, key, embedding = _answer_inputs(retrieval, question, template)
+    chunk_ids = retrieval["chunk_ids"]
+
+    cached = get_cached_answer(key, chunk_ids, embedding)
+    if cached is not None:
+        return cached
+
+    prompt = build_prompt(question, retrieval, template)
+    async with _llm_slot():
+        with stage("llm"):
+            response = await get_llm().acomplete(prompt)
+    answer = str(response)
+    set_cached_answer(key, chunk_ids, answer, embedding)
+    return answer
+
+
+async def astream_answer(
+    retrieval: Dict[str, Any], question: Optional[str] = None, template: str = "kb_answer"
+) -> AsyncIterator[str]:
+    question, key, embedding = _answer_inputs(retrieval, question, template)
+    chunk_ids = retrieval["chunk_ids"]
+
+    cached = get_cached_answer(key, chunk_ids, embedding)
+    if cached is not None:
+        yield cached
+        return
+
+    prompt = build_prompt(question, retrieval, template)
+    parts: List[str] = []
+    async with _llm_slot():
+        start = time.perf_counter()
+        async for chunk in await get_llm().astream_complete(prompt):
+            if chunk.delta:
+                if not parts:
+                    record_stage("llm_first_token", time.perf_counter() - start)
+                parts.append(chunk.delta)
+                yield chunk.delta
+        record_stage("llm", time.perf_counter() - start)
+
+    set_cached_answer(key, chunk_ids, "".join(parts), embedding)
+
+
+def ask_question(question: str, top_k: int = 4, template: str = "kb_answer", query: Optional[str] = None) -> dict:
+    """
+    Retrieve with `query` (defaults to the question), answer `question` with the given prompt template.
+    """
+    retrieval = retrieve_context(query or question, top_k=top_k)
+    return {"answer": generate_answer(retrieval, question, template), "sources": retrieval["sources"]}
+
 
-    # 2) generation (use retrieved context)
-    context = "\n\n".join([s["snippet"] for s in sources]) if sources else ""
-
-    prompt = (
-        "You are an enterprise knowledge assistant.\n"
-        "Use ONLY the context below.\n"
-        "If the context is not enough, say: 'Not found in knowledge base' and ask ONE clarifying question.\n\n"
-        "Rules:\n"
-        "- Extract steps ONLY from the context. Do not invent new steps.\n"
-        "- If the context lists multiple items, include ALL of them.\n"
-        "- Keep each step to one line.\n\n"
-        f"Context:\n{context}\n\n"
-        "Output format (MUST follow):\n"
-        "Summary: <one sentence>\n"
-        "Steps:\n"
-        "- <step 1>\n"
-        "- <step 2>\n"
-        "- <step 3>\n"
-        "- <step N>\n"
-        "Done.\n\n"
-        "Formatting rules:\n"
-        "- Each step MUST start with '- '.\n"
-        f"User question: {question}\n"
-    )
-
-    response = llm.complete(prompt)
-    return {"answer": str(response), "sources": sources}
+async def aask_question(
+    question: str, top_k: int = 4, template: str = "kb_answer", query: Optional[str] = None
+) -> dict:
+    retrieval = await aretrieve_context(query or question, top_k=top_k)
+    return {"answer": await agenerate_answer(retrieval, question, template), "sources": retrieval["sources"]}
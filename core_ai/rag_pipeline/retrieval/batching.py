@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Callable, List, Sequence, Tuple
+
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.vector_stores.types import VectorStoreQuery
+
+from core_ai.observability.metrics import BATCH_SIZE
+from core_ai.rag_pipeline.indexing.tenancy import tenant_filters
+
+
+class MicroBatcher:
+    """
+    Request coalescer: items submitted from any thread or event loop within `max_wait_ms` of
+    the first one (up to `max_batch`) are processed by one call of `fn(items) -> results`, and
+    each caller's future gets its own result.
+
+    A single daemon worker thread runs the batches, so the wait is only paid when requests
+    actually overlap: while one batch is being processed the next one fills up.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[Any]], Sequence[Any]], max_batch: int, max_wait_ms: float):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[Tuple[Any, Future]]" = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                    self._worker.start()
+        fut: Future = Future()
+        self._queue.put((item, fut))
+        return fut
+
+    async def asubmit(self, item: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            BATCH_SIZE.observe(len(batch), batcher=self.name)
+            try:
+                results = list(self.fn([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(batch)} items")
+                for (_, fut), result in zip(batch, results):
+                    fut.set_result(result)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+
+def batching_enabled() -> bool:
+    return os.getenv("QUERY_BATCHING", "true").lower() == "true"
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    from core_ai.rag_pipeline.retrieval.ask import embed_queries
+
+    return embed_queries(texts)
+
+
+def _search_batch(requests: List[Tuple[Any, List[float], int]]) -> List[List[NodeWithScore]]:
+    """
+    requests: [(vector_store, embedding, top_k, tenant)]. Qdrant gets one query_batch_points call
+    per store (one round trip for the whole batch, tenants filtered per request); other stores
+    are queried one by one.
+    """
+    results: List[List[NodeWithScore]] = [[] for _ in requests]
+    by_store: dict = {}
+    for i, (store, embedding, top_k, tenant) in enumerate(requests):
+        by_store.setdefault(id(store), (store, []))[1].append((i, embedding, top_k, tenant))
+
+    for store, items in by_store.values():
+        if hasattr(store, "collection_name") and hasattr(store, "parse_to_query_result"):
+            from qdrant_client import models
+
+            from core_ai.rag_pipeline.indexing.vector_store import qdrant_tenant_filter, search_params
+
+            params = search_params()
+            responses = store.client.query_batch_points(
+                collection_name=store.collection_name,
+                requests=[
+                    models.QueryRequest(
+                        query=emb,
+                        using=store.dense_vector_name,
+                        limit=k,
+                        filter=qdrant_tenant_filter(tenant),
+                        params=params,
+                        with_payload=True,
+                    )
+                    for _, emb, k, tenant in items
+                ],
+            )
+            parsed = [store.parse_to_query_result(r.points) for r in responses]
+        else:
+            parsed = [
+                store.query(VectorStoreQuery(query_embedding=emb, similarity_top_k=k, filters=tenant_filters(tenant)))
+                for _, emb, k, tenant in items
+            ]
+
+        for (i, _, _, _), res in zip(items, parsed):
+            results[i] = [
+                NodeWithScore(node=node, score=score)
+                for node, score in zip(res.nodes or [], res.similarities or [])
+            ]
+    return results
+
+
+@lru_cache(maxsize=1)
+def get_embed_batcher() -> MicroBatcher:
+    return MicroBatcher(
+        "embed",
+        _embed_batch,
+        max_batch=int(os.getenv("QUERY_BATCH_MAX_SIZE", "32")),
+        max_wait_ms=float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "3")),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_search_batcher() -> MicroBatcher:
+    return MicroBatcher(
+        "search",
+        _search_batch,
+        max_batch=int(os.getenv("QUERY_BATCH_MAX_SIZE", "32")),
+        max_wait_ms=float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "3")),
+    )
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry time-to-live and hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [(k, v) for k, (exp, v) in self._data.items() if exp >= now]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def normalize_query(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+# Level 1: query text -> embedding (embedding model never changes at runtime, so no invalidation)
+query_embedding_cache = TTLCache(
+    maxsize=int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048")),
+    ttl_s=float(os.getenv("QUERY_EMBED_CACHE_TTL", "3600")),
+)
+
+# Level 2: (normalized query, retrieved chunk IDs, index version) -> answer
+answer_cache = TTLCache(
+    maxsize=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+    ttl_s=float(os.getenv("ANSWER_CACHE_TTL", "900")),
+)
+
+# Bumped whenever ingestion adds/replaces/removes chunks; part of every answer-cache key
+_index_version = 0
+semantic_hits = 0
+
+
+def on_index_changed() -> None:
+    """
+    Called by ingestion after the collection changed: cached answers may cite stale chunks.
+    """
+    global _index_version
+    _index_version += 1
+    answer_cache.clear()
+
+
+def _answer_key(question: str, chunk_ids: Sequence[str]) -> Tuple[Any, ...]:
+    return (normalize_query(question), tuple(chunk_ids), _index_version)
+
+
+def get_cached_answer(
+    question: str,
+    chunk_ids: Sequence[str],
+    embedding: Optional[Sequence[float]] = None,
+) -> Optional[str]:
+    """
+    Exact match on the normalized question first. If ANSWER_CACHE_SIMILARITY is set (e.g. 0.95),
+    fall back to the most similar cached question that retrieved the same chunks.
+    """
+    global semantic_hits
+    key = _answer_key(question, chunk_ids)
+    entry = answer_cache.get(key)
+    if entry is not None:
+        return entry["answer"]
+
+    threshold = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0") or 0)
+    if threshold <= 0 or embedding is None:
+        return None
+
+    candidates = [
+        v for k, v in answer_cache.items() if k[1:] == key[1:] and v["embedding"] is not None
+    ]
+    if not candidates:
+        return None
+
+    q = np.asarray(embedding, dtype=np.float32)
+    mat = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+    sims = mat @ q / (np.linalg.norm(mat, axis=1) * np.linalg.norm(q) + 1e-9)
+    best = int(np.argmax(sims))
+    if sims[best] >= threshold:
+        semantic_hits += 1
+        return candidates[best]["answer"]
+    return None
+
+
+def set_cached_answer(
+    question: str,
+    chunk_ids: Sequence[str],
+    answer: str,
+    embedding: Optional[Sequence[float]] = None,
+) -> None:
+    answer_cache.set(
+        _answer_key(question, chunk_ids),
+        {"answer": answer, "embedding": list(embedding) if embedding is not None else None},
+    )
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {
+        "index_version": _index_version,
+        "query_embedding": query_embedding_cache.stats(),
+        "answer": {**answer_cache.stats(), "semantic_hits": semantic_hits},
+    }
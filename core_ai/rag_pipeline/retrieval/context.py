@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from llama_index.core.utils import get_tokenizer
+
+
+SNIPPET_CHARS = 240
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """
+    Token count with the tokenizer LlamaIndex already loads (tiktoken, cached process-wide).
+    Not the exact tokenizer of every Ollama model, but close enough for budgeting; chunk texts
+    repeat across queries, so counts are memoized.
+    """
+    return len(get_tokenizer()(text))
+
+
+def context_token_budget() -> int:
+    """
+    CONTEXT_TOKEN_BUDGET if set, otherwise the Ollama context window minus room for the
+    instructions and the answer (CONTEXT_RESERVE_TOKENS).
+    """
+    explicit = os.getenv("CONTEXT_TOKEN_BUDGET")
+    if explicit:
+        return int(explicit)
+    window = int(os.getenv("OLLAMA_CONTEXT_WINDOW", "4096"))
+    return max(256, window - int(os.getenv("CONTEXT_RESERVE_TOKENS", "1024")))
+
+
+def make_snippet(text: str) -> str:
+    """Short citation text shown with sources (never sent to the LLM)."""
+    text = text or ""
+    return (text[:SNIPPET_CHARS] + "...") if len(text) > SNIPPET_CHARS else text
+
+
+def _merge_spans(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group chunks of the same source document and stitch them in document order:
+    overlapping chunks (splitter overlap) contribute only their new tail, adjacent ones are
+    concatenated, duplicates disappear. Each merged block keeps the best rank of its parts.
+    """
+    blocks: List[Dict[str, Any]] = []
+    by_doc: Dict[Any, List[Dict[str, Any]]] = {}
+    for rank, chunk in enumerate(chunks):
+        item = {**chunk, "rank": rank}
+        if chunk.get("doc_id") is None or chunk.get("start") is None or chunk.get("end") is None:
+            blocks.append(item)  # no position info: cannot be merged safely
+        else:
+            by_doc.setdefault(chunk["doc_id"], []).append(item)
+
+    for parts in by_doc.values():
+        parts.sort(key=lambda c: c["start"])
+        current: Optional[Dict[str, Any]] = None
+        for part in parts:
+            if current is not None and part["start"] <= current["end"]:
+                if part["end"] > current["end"]:
+                    current["text"] += part["text"][current["end"] - part["start"] :]
+                    current["end"] = part["end"]
+                current["rank"] = min(current["rank"], part["rank"])
+                continue
+            if current is not None:
+                blocks.append(current)
+            current = dict(part)
+        if current is not None:
+            blocks.append(current)
+
+    # Exact duplicates without position info (e.g. the same text indexed twice)
+    seen = set()
+    unique = []
+    for block in sorted(blocks, key=lambda b: b["rank"]):
+        key = block["text"].strip()
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(block)
+    return unique
+
+
+def _truncate_to_tokens(text: str, budget: int) -> str:
+    # Keep whole lines (runbook steps are one per line) while they fit
+    kept: List[str] = []
+    used = 0
+    for line in text.splitlines(keepends=True):
+        cost = count_tokens(line)
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "".join(kept).rstrip()
+
+
+def pack_context(chunks: List[Dict[str, Any]], budget: Optional[int] = None) -> str:
+    """
+    Build the LLM context from retrieved chunks (best first): merge overlapping/adjacent chunks,
+    then add blocks in relevance order until the token budget is spent. The last block that
+    does not fit is cut at a line boundary.
+    chunks: [{"file", "section", "text", "doc_id", "start", "end"}, ...] as produced by retrieval;
+    each block is headed by its file and section title.
+    """
+    budget = context_token_budget() if budget is None else budget
+    parts: List[str] = []
+    used = 0
+    for block in _merge_spans(chunks):
+        section = f" > {block['section']}" if block.get("section") else ""
+        header = f"[Source: {block.get('file', 'unknown')}{section}]\n"
+        text = block["text"].strip()
+        cost = count_tokens(header) + count_tokens(text)
+        remaining = budget - used
+        if cost > remaining:
+            text = _truncate_to_tokens(text, remaining - count_tokens(header))
+            if not text:
+                break
+            parts.append(header + text)
+            break
+        parts.append(header + text)
+        used += cost
+    return "\n\n".join(parts)
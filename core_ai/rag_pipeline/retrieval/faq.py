@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core_ai.rag_pipeline.indexing.manifest import get_manifest_path, kb_object
+
+
+FAQ_VERSION = 1
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def faq_key(question: str) -> str:
+    """Case, whitespace and punctuation insensitive hash of a question."""
+    normalized = " ".join(_WORD_RE.findall((question or "").lower()))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def faq_enabled() -> bool:
+    return os.getenv("FAQ_ENABLED", "true").lower() == "true"
+
+
+class FAQStore:
+    """
+    Precomputed answers for frequent questions, stored as JSON next to the ingest manifest.
+    Entry: {"question", "agent", "answer", "sources", "chunk_ids", "embedding", "stale"}, keyed
+    by faq_key(question). Entries are marked stale when ingestion replaces or deletes any of
+    their chunk IDs; stale entries are never served and are picked up by the FAQ builder.
+    Questions the builder could not answer from the knowledge base are remembered as misses
+    ({"question", "version"}) so they are only retried once the index has changed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._misses: Dict[str, Dict[str, Any]] = {}
+        # (keys, normalized embedding matrix) of the servable entries, rebuilt after changes
+        self._matrix: Optional[Tuple[List[str], np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            entries: Dict[str, Dict[str, Any]] = {}
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == FAQ_VERSION:
+                    entries = data.get("entries", {})
+                    self._misses = data.get("misses", {})
+            self._entries = entries
+        return self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def save(self) -> None:
+        with self._lock:
+            entries = self._load()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(
+                json.dumps({"version": FAQ_VERSION, "entries": entries, "misses": self._misses}), encoding="utf-8"
+            )
+            os.replace(tmp, self.path)
+
+    def put(
+        self,
+        question: str,
+        result: Dict[str, Any],
+        chunk_ids: Sequence[str],
+        embedding: Optional[Sequence[float]],
+    ) -> None:
+        with self._lock:
+            self._load()[faq_key(question)] = {
+                "question": question,
+                "agent": result["agent"],
+                "answer": result["answer"],
+                "sources": result["sources"],
+                "chunk_ids": list(chunk_ids),
+                "embedding": list(embedding) if embedding is not None else None,
+                "stale": False,
+            }
+            self._misses.pop(faq_key(question), None)
+            self._matrix = None
+
+    def remove(self, question: str) -> None:
+        with self._lock:
+            if self._load().pop(faq_key(question), None) is not None:
+                self._matrix = None
+
+    def mark_missed(self, question: str, version: str) -> None:
+        """Remember that question had no grounded answer at index version `version`."""
+        with self._lock:
+            self._load()
+            self._misses[faq_key(question)] = {"question": question, "version": version}
+
+    def missed(self, question: str, version: str) -> bool:
+        with self._lock:
+            self._load()
+            miss = self._misses.get(faq_key(question))
+        return miss is not None and miss["version"] == version
+
+    def __contains__(self, question: str) -> bool:
+        with self._lock:
+            return faq_key(question) in self._load()
+
+    def questions(self, stale_only: bool = False) -> List[str]:
+        with self._lock:
+            return [e["question"] for e in self._load().values() if e["stale"] or not stale_only]
+
+    def invalidate(self, chunk_ids: Iterable[str]) -> int:
+        """Mark entries citing any of these chunks as stale. Returns how many were marked."""
+        changed = set(chunk_ids)
+        marked = 0
+        with self._lock:
+            for entry in self._load().values():
+                if not entry["stale"] and changed.intersection(entry["chunk_ids"]):
+                    entry["stale"] = True
+                    marked += 1
+            if marked:
+                self._matrix = None
+                self.save()
+        return marked
+
+    def _servable(self) -> Tuple[List[str], np.ndarray]:
+        with self._lock:
+            if self._matrix is None:
+                entries = self._load()
+                keys = [k for k, e in entries.items() if not e["stale"] and e.get("embedding")]
+                if keys:
+                    m = np.asarray([entries[k]["embedding"] for k in keys], dtype=np.float32)
+                    m /= np.linalg.norm(m, axis=1, keepdims=True) + 1e-12
+                else:
+                    m = np.zeros((0, 0), dtype=np.float32)
+                self._matrix = (keys, m)
+            return self._matrix
+
+    def lookup_exact(self, question: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._load().get(faq_key(question))
+        return entry if entry is not None and not entry["stale"] else None
+
+    def lookup_similar(self, embedding: Sequence[float], threshold: float) -> Optional[Dict[str, Any]]:
+        """Nearest servable entry by cosine similarity, if it reaches `threshold`."""
+        keys, matrix = self._servable()
+        if not keys:
+            return None
+        q = np.asarray(embedding, dtype=np.float32)
+        scores = matrix @ (q / (np.linalg.norm(q) + 1e-12))
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        with self._lock:
+            return self._load().get(keys[best])
+
+
+def get_faq_store(collection: Optional[str] = None, tenant: Optional[str] = None) -> FAQStore:
+    """One FAQ store per knowledge base, stored next to its ingest manifest."""
+    state_dir = get_manifest_path(collection, tenant).parent
+    return kb_object(state_dir, "faq", lambda: FAQStore(state_dir / "faq.json"))
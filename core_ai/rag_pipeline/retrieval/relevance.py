@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence
+
+from core_ai.rag_pipeline.indexing.manifest import get_manifest_path, kb_object
+from core_ai.rag_pipeline.indexing.sparse_index import tokenize
+
+
+TOPICS_VERSION = 1
+
+# Words that say nothing about the topic of a question ("how do I apply for ...", "steps to ...")
+GENERIC_TERMS = {
+    "company", "policy", "process", "step", "please", "help",
+    "how", "what", "why", "when", "where", "which", "tell", "explain",
+    "guide", "detail", "procedure", "info", "information",
+    "apply", "request", "create", "new", "issue", "problem",
+    "should", "would", "could", "need", "want", "about", "there", "have", "get",
+    "not", "many", "much",
+}
+
+
+def normalize_term(token: str) -> str:
+    """Light suffix folding so "connecting" / "connects" / "connected" meet "connect"."""
+    for suffix in ("ing", "ed"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[: -len(suffix)]
+    if token.endswith("s") and not token.endswith("ss") and len(token) > 4:
+        return token[:-1]
+    return token
+
+
+def keyword_terms(text: str) -> List[str]:
+    """Normalized terms of a text, in order (stopwords and words under three characters dropped)."""
+    return [normalize_term(t) for t in tokenize(text) if len(t) > 2]
+
+
+def keyword_set(text: str, limit: Optional[int] = None) -> List[str]:
+    """
+    Distinct normalized terms, most frequent first (ties in order of appearance), at most
+    `limit` of them. Stored per chunk as its keyword set (chunking.py).
+    """
+    counts = Counter(keyword_terms(text))
+    ranked = sorted(counts, key=lambda t: -counts[t])
+    return ranked[:limit] if limit else ranked
+
+
+@lru_cache(maxsize=4096)
+def question_terms(question: str) -> FrozenSet[str]:
+    """Topic-bearing terms of a question: normalized, without stopwords and generic words."""
+    return frozenset(t for t in keyword_terms(question or "") if t not in GENERIC_TERMS)
+
+
+def snippet_terms(sources: Sequence[Dict[str, Any]]) -> FrozenSet[str]:
+    # Only for sources without precomputed keywords (chunks indexed before chunking.py, agents
+    # that return finished answers): their terms are derived from the citation snippets
+    return frozenset(t for s in sources for t in keyword_terms(s.get("snippet") or ""))
+
+
+def covers(q_terms: FrozenSet[str], terms: Iterable[str]) -> bool:
+    """True when the retrieved text shares at least one topic term with the question."""
+    return not q_terms or not q_terms.isdisjoint(terms)
+
+
+class TopicStore:
+    """
+    Per-file topic vocabularies learned from the corpus, stored as JSON next to the ingest
+    manifest and rebuilt after every ingest that changes the knowledge base.
+
+    A file's topic terms are its TOPIC_TERMS highest TF-IDF terms (files as documents, over the
+    BM25 postings, so chunk texts are not tokenized again); the file name and section titles
+    are part of every chunk's indexed text, so their words rank high. The store also keeps the
+    corpus vocabulary (every normalized term) to spot question words the knowledge base has
+    never seen.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._files: Optional[Dict[str, FrozenSet[str]]] = None
+        self._vocabulary: FrozenSet[str] = frozenset()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, FrozenSet[str]]:
+        if self._files is None:
+            files: Dict[str, FrozenSet[str]] = {}
+            vocabulary: FrozenSet[str] = frozenset()
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                if data.get("version") == TOPICS_VERSION:
+                    files = {f: frozenset(terms) for f, terms in data.get("files", {}).items()}
+                    vocabulary = frozenset(data.get("vocabulary", []))
+            self._files, self._vocabulary = files, vocabulary
+        return self._files
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def rebuild(self, file_chunks: Mapping[str, Sequence[str]], sparse_index: Any, top_n: Optional[int] = None) -> None:
+        """
+        file_chunks: {file name: chunk IDs} (the manifest's files, keyed like the sources' "file").
+        Term counts come from sparse_index.term_counts_by_group() (one pass over the postings).
+        """
+        top_n = top_n or int(os.getenv("TOPIC_TERMS", "15"))
+        counts: Dict[str, Counter] = {}
+        for file_name, file_counts in sparse_index.term_counts_by_group(file_chunks).items():
+            merged = counts.setdefault(file_name, Counter())
+            for term, n in file_counts.items():
+                if len(term) > 2:
+                    merged[normalize_term(term)] += n
+
+        df = Counter(term for tf in counts.values() for term in tf)
+        n_files = len(counts)
+        files: Dict[str, FrozenSet[str]] = {}
+        for file_name, tf in counts.items():
+            total = sum(tf.values()) or 1
+            # Smoothed IDF keeps a one-file corpus meaningful; a term found in every file (".txt")
+            # says nothing about any of them
+            weights = {
+                term: (n / total) * (math.log((1 + n_files) / (1 + df[term])) + 1)
+                for term, n in tf.items()
+                if term not in GENERIC_TERMS and (n_files == 1 or df[term] < n_files)
+            }
+            # Ties broken by term so the vocabulary does not depend on hash order
+            files[file_name] = frozenset(sorted(weights, key=lambda t: (-weights[t], t))[:top_n])
+
+        with self._lock:
+            self._files, self._vocabulary = files, frozenset(df)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(
+                json.dumps(
+                    {
+                        "version": TOPICS_VERSION,
+                        "files": {f: sorted(terms) for f, terms in files.items()},
+                        "vocabulary": sorted(self._vocabulary),
+                    }
+                ),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path)
+
+    def match(self, q_terms: FrozenSet[str], file_name: str, score: Optional[float] = None) -> bool:
+        """
+        Does the question belong to this file's topic? It must share a topic term with the file
+        (a misspelt topic term, one edit away, counts). When that match is weak (a single topic
+        term, and a retrieval score below TOPIC_WEAK_SCORE or unknown), words the corpus has
+        never seen count against it: "maternity leave" shares only "leave" with an annual leave
+        policy and "maternity" appears nowhere. A strong match is kept whatever else the question
+        says. Files without a learned vocabulary (knowledge base not re-ingested yet) always match.
+        """
+        with self._lock:
+            topics = self._load().get(file_name)
+            vocabulary = self._vocabulary
+        if topics is None:
+            return True
+        unseen = q_terms - vocabulary
+        typos = {t for t in unseen if any(_one_edit(t, topic) for topic in topics)}
+        matched = len(q_terms & topics) + len(typos)
+        if matched == 0:
+            return False
+        weak = matched == 1 and (score is None or score < float(os.getenv("TOPIC_WEAK_SCORE", "0.5")))
+        return not weak or matched > len(unseen - typos)
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """
+    a is b with one letter inserted, deleted, replaced or two neighbours swapped (words of 5+
+    letters with the same first letter: "maternity" is not a typo of "paternity").
+    """
+    if min(len(a), len(b)) < 5 or abs(len(a) - len(b)) > 1 or a == b or a[0] != b[0]:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1 :]
+    return a[i + 1 :] == b[i + 1 :] or (a[i + 2 :] == b[i + 2 :] and a[i : i + 2] == b[i : i + 2][::-1])
+
+
+def get_topic_store(collection: Optional[str] = None, tenant: Optional[str] = None) -> TopicStore:
+    """One topic store per knowledge base, stored next to its ingest manifest."""
+    state_dir = get_manifest_path(collection, tenant).parent
+    return kb_object(state_dir, "topics", lambda: TopicStore(state_dir / "topics.json"))
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import time
+from functools import lru_cache
+from typing import Any, List
+
+from core_ai.observability.metrics import stage
+from core_ai.rag_pipeline.retrieval.cache import TTLCache, normalize_query
+
+
+# (normalized query, chunk ID) -> cross-encoder score. Chunk IDs are derived from file content,
+# so a changed chunk gets a new ID and never hits a stale score.
+rerank_score_cache = TTLCache(
+    maxsize=int(os.getenv("RERANK_CACHE_SIZE", "8192")),
+    ttl_s=float(os.getenv("RERANK_CACHE_TTL", "3600")),
+)
+
+
+def rerank_enabled() -> bool:
+    return os.getenv("RERANK_ENABLED", "false").lower() == "true"
+
+
+def rerank_candidates(top_k: int) -> int:
+    """How many candidates retrieval should hand to rerank() for a final top_k."""
+    if not rerank_enabled():
+        return top_k
+    return max(top_k, int(os.getenv("RERANK_CANDIDATES", "20")))
+
+
+@lru_cache(maxsize=1)
+def get_reranker() -> Any:
+    # Imported lazily: sentence-transformers is only needed when reranking is switched on
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(
+        os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+        device="cpu",
+        max_length=int(os.getenv("RERANK_MAX_LENGTH", "512")),
+    )
+
+
+def rerank(question: str, nodes: List[Any], top_k: int) -> List[Any]:
+    """
+    Reorder retrieved nodes (NodeWithScore, best first) by cross-encoder relevance and keep top_k.
+
+    Pairs are scored in batches of RERANK_BATCH_SIZE. If the RERANK_BUDGET_MS budget runs out
+    before every candidate has a score, the dense order is kept (scores computed so far are
+    still cached, so the next identical query is cheaper). node.score is left untouched: it stays
+    the cosine similarity the confidence checks are calibrated for.
+    """
+    if not rerank_enabled() or len(nodes) <= 1:
+        return nodes[:top_k]
+
+    with stage("rerank"):
+        key = normalize_query(question)
+        scores = {}
+        todo = []
+        for n in nodes:
+            cached = rerank_score_cache.get((key, n.node.node_id))
+            if cached is not None:
+                scores[n.node.node_id] = cached
+            else:
+                todo.append(n)
+
+        budget_s = float(os.getenv("RERANK_BUDGET_MS", "200")) / 1000
+        batch_size = max(1, int(os.getenv("RERANK_BATCH_SIZE", "16")))
+        deadline = time.perf_counter() + budget_s
+
+        for start in range(0, len(todo), batch_size):
+            if time.perf_counter() > deadline:
+                return nodes[:top_k]
+            batch = todo[start : start + batch_size]
+            pairs = [(question, n.node.get_content()) for n in batch]
+            for n, score in zip(batch, get_reranker().predict(pairs, batch_size=batch_size)):
+                scores[n.node.node_id] = float(score)
+                rerank_score_cache.set((key, n.node.node_id), float(score))
+
+        # Stable sort: ties keep their dense/fused order
+        return sorted(nodes, key=lambda n: scores[n.node.node_id], reverse=True)[:top_k]
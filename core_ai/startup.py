@@ -0,0 +1,131 @@
+"""
+Process warmup and readiness.
+
+Everything expensive (embedding model, index + BM25 state, router centroids, reranker, the
+Ollama model itself) is loaded by a background thread right after startup instead of inside
+the first request. Each step reports its own state, so /ready can tell which component is
+still loading or failed. Heavy modules are imported inside the steps: importing this module
+costs nothing.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core_ai.observability.metrics import stage
+
+
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_status: Dict[str, Dict[str, Any]] = {}
+
+
+def _warm_embed_model() -> Optional[str]:
+    from core_ai.rag_pipeline.indexing.embeddings import get_embed_model
+    from core_ai.rag_pipeline.retrieval.ask import embed_query
+
+    get_embed_model()
+    embed_query("warmup")  # first forward pass allocates the model's buffers
+    return None
+
+
+def _warm_index() -> Optional[str]:
+    from core_ai.rag_pipeline.indexing.index_manager import get_index
+    from core_ai.rag_pipeline.retrieval.ask import retrieve_context
+
+    store = get_index().vector_store
+    client = getattr(store, "client", None)
+    if client is not None and hasattr(store, "collection_name"):
+        # Also proves Qdrant is reachable
+        if not client.collection_exists(store.collection_name):
+            return "collection not created yet (run /ingest)"
+    retrieve_context("warmup", top_k=1)  # loads the BM25 index and opens connections
+    return None
+
+
+def _warm_router() -> Optional[str]:
+    from core_ai.agent_system.router import get_agent_router, get_topic_router
+
+    get_agent_router().warm()
+    get_topic_router().warm()
+    return None
+
+
+def _warm_reranker() -> Optional[str]:
+    from core_ai.rag_pipeline.retrieval.rerank import get_reranker, rerank_enabled
+
+    if not rerank_enabled():
+        return "disabled"
+    get_reranker().predict([("warmup", "warmup")])
+    return None
+
+
+def _warm_llm() -> Optional[str]:
+    from core_ai.rag_pipeline.generation.llm_client import get_llm
+
+    if os.getenv("WARMUP_LLM", "true").lower() != "true":
+        return "skipped (WARMUP_LLM=false)"
+    # Makes Ollama load the model into memory; OLLAMA_KEEP_ALIVE keeps it there
+    get_llm().complete("Reply with OK.")
+    return None
+
+
+# Order matters: the index and router steps reuse the loaded embedding model
+STEPS: List[Tuple[str, Callable[[], Optional[str]]]] = [
+    ("embed_model", _warm_embed_model),
+    ("index", _warm_index),
+    ("router", _warm_router),
+    ("reranker", _warm_reranker),
+    ("llm", _warm_llm),
+]
+
+
+def required_components() -> List[str]:
+    """Components that must be ready for /ready to pass (READY_COMPONENTS, comma-separated)."""
+    raw = os.getenv("READY_COMPONENTS", "embed_model,index,router,reranker")
+    return [c.strip() for c in raw.split(",") if c.strip()]
+
+
+def _run(names: List[str]) -> None:
+    for name, step in STEPS:
+        if name not in names:
+            continue
+        _status[name] = {"state": "loading"}
+        start = time.perf_counter()
+        try:
+            with stage(name, pipeline="warmup"):
+                detail = step()
+            _status[name] = {"state": "ready", "detail": detail}
+        except Exception as e:
+            _status[name] = {"state": "failed", "error": f"{type(e).__name__}: {e}"}
+        _status[name]["seconds"] = round(time.perf_counter() - start, 3)
+
+
+def start_warmup(retry_failed: bool = False) -> None:
+    """
+    Start the warmup thread (once per process). With retry_failed, a finished warmup re-runs
+    the steps that failed, e.g. because Qdrant or Ollama was not up yet.
+    """
+    global _thread
+    with _lock:
+        if _thread is None:
+            names = [name for name, _ in STEPS]
+        elif retry_failed and not _thread.is_alive():
+            names = [name for name, _ in STEPS if _status.get(name, {}).get("state") == "failed"]
+        else:
+            return
+        if not names:
+            return
+        for name in names:
+            _status[name] = {"state": "pending"}
+        _thread = threading.Thread(target=_run, args=(names,), name="warmup", daemon=True)
+        _thread.start()
+
+
+def readiness() -> Dict[str, Any]:
+    """{"ready", "components": {name: {"state", "seconds", "detail" | "error"}}}"""
+    components = {name: dict(_status.get(name, {"state": "pending"})) for name, _ in STEPS}
+    ready = all(components[c]["state"] == "ready" for c in required_components() if c in components)
+    return {"ready": ready, "components": components}
@@ -0,0 +1,143 @@
+"""
+Embedding backend benchmark on the local corpus (runs in-process: no API, Qdrant or Ollama).
+
+    python -m evaluation.embed_benchmark --backends torch,onnx,onnx-int8 --threads 4 --batch-size 32
+
+Per backend: model load time, corpus embedding throughput (chunks/s, the ingestion cost),
+single-query latency, recall@k of its exact top-k against the first backend's top-k, and the
+source hit rate on the regression questions. The first backend is the reference, so keep the
+one you run today first.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from llama_index.core.schema import MetadataMode
+
+from core_ai.rag_pipeline.indexing.embeddings import BACKENDS, DEFAULT_EMBED_MODEL, load_embed_model
+from core_ai.rag_pipeline.indexing.index_manager import get_splitter
+from core_ai.rag_pipeline.ingestion.load_documents import load_documents
+
+
+TESTS_PATH = Path("evaluation/regression_tests/questions.json")
+REPORTS_DIR = Path("evaluation/reports")
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-12)
+
+
+def _percentile(values: List[float], p: float) -> float:
+    return round(float(np.percentile(values, p)), 2) if values else 0.0
+
+
+def bench_backend(
+    backend: str,
+    texts: List[str],
+    questions: List[str],
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    start = time.perf_counter()
+    model = load_embed_model(
+        backend,
+        model_name=args.model,
+        threads=args.threads,
+        batch_size=args.batch_size,
+    )
+    model.get_query_embedding("warmup")
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    corpus = _normalize(np.asarray(model.get_text_embedding_batch(texts), dtype=np.float32))
+    corpus_s = time.perf_counter() - start
+
+    latencies = []
+    queries = []
+    for q in questions:
+        t = time.perf_counter()
+        queries.append(model.get_query_embedding(q))
+        latencies.append((time.perf_counter() - t) * 1000)
+
+    scores = _normalize(np.asarray(queries, dtype=np.float32)) @ corpus.T
+    top = np.argsort(-scores, axis=1)[:, : args.k]
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "corpus_s": round(corpus_s, 2),
+        "chunks_per_s": round(len(texts) / corpus_s, 1) if corpus_s > 0 else 0.0,
+        "query_ms": {"p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95)},
+        "top": top,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Compare embedding backends: throughput and recall@k")
+    p.add_argument("--backends", default="torch,onnx,onnx-int8", help=f"comma-separated, from: {', '.join(BACKENDS)}")
+    p.add_argument("--data-dir", default=os.getenv("DATA_DIR", "./data/raw_documents"))
+    p.add_argument("--model", default=os.getenv("EMBED_MODEL", DEFAULT_EMBED_MODEL))
+    p.add_argument("--threads", type=int, default=None, help="intra-op threads per backend")
+    p.add_argument("--batch-size", type=int, default=int(os.getenv("EMBED_BATCH_SIZE", "64")))
+    p.add_argument("--k", type=int, default=4)
+    args = p.parse_args()
+
+    nodes = get_splitter().get_nodes_from_documents(load_documents(args.data_dir))
+    texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+    files = [(n.metadata or {}).get("file_name", "") for n in nodes]
+    tests = json.loads(TESTS_PATH.read_text(encoding="utf-8"))
+    questions = [t["question"] for t in tests]
+    print(f"{len(texts)} chunks from {args.data_dir}, {len(questions)} questions, k={args.k}\n")
+
+    results = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        try:
+            results.append(bench_backend(backend, texts, questions, args))
+        except Exception as e:
+            # Missing optional runtime (onnxruntime / openvino) or export: report and go on
+            results.append({"backend": backend, "error": f"{type(e).__name__}: {e}"})
+
+    tops = [r.pop("top", None) for r in results]
+    reference = next((r["backend"] for r, top in zip(results, tops) if top is not None), None)
+    ref_top = next((top for top in tops if top is not None), None)
+    for r, top in zip(results, tops):
+        if top is None:
+            continue
+        r["recall_at_k"] = round(
+            float(np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(top, ref_top)])), 4
+        )
+        labelled = [(t, row) for t, row in zip(tests, top) if t.get("expected_source_contains")]
+        hits = [
+            any(t["expected_source_contains"].lower() in files[i].lower() for i in row) for t, row in labelled
+        ]
+        r["source_hit_rate"] = round(sum(hits) / len(hits), 4) if hits else None
+
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<14} ERROR {r['error']}")
+            continue
+        print(
+            f"{r['backend']:<14} load {r['load_s']:>6.2f}s | {r['chunks_per_s']:>8.1f} chunks/s | "
+            f"query p50 {r['query_ms']['p50']:>6.2f}ms p95 {r['query_ms']['p95']:>6.2f}ms | "
+            f"recall@{args.k} {r['recall_at_k']:.3f} | source hit {r['source_hit_rate']}"
+        )
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "model": args.model,
+        "threads": args.threads,
+        "batch_size": args.batch_size,
+        "k": args.k,
+        "chunks": len(texts),
+        "reference": reference,
+        "results": results,
+    }
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    (REPORTS_DIR / "embed_benchmark_latest.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
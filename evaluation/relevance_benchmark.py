@@ -0,0 +1,160 @@
+"""
+Micro-benchmark of the lexical relevance guard (runs in-process on a synthetic corpus: no API,
+Qdrant, Ollama or embedding model).
+
+    python -m evaluation.relevance_benchmark --files 10,100,1000 --chunks-per-file 20
+
+For each corpus size: the ingest-time cost (per-chunk keyword sets, topic vocabularies) and the
+per-request cost of the query-time checks in relevance.py (set intersections on precomputed
+terms) next to the previous request-time implementation (substring scans over joined snippets
+and a per-file keyword table). The query-time numbers should stay flat as the corpus grows.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from llama_index.core.schema import TextNode
+
+from core_ai.rag_pipeline.indexing.sparse_index import SparseIndex
+from core_ai.rag_pipeline.retrieval.context import make_snippet
+from core_ai.rag_pipeline.retrieval.relevance import (
+    GENERIC_TERMS,
+    TopicStore,
+    covers,
+    keyword_set,
+    question_terms,
+)
+
+
+REPORTS_DIR = Path("evaluation/reports")
+
+COMMON = ["the", "user", "system", "open", "check", "settings", "then", "click", "select", "again", "device", "account"]
+
+
+def _percentile(values: List[float], p: float) -> float:
+    return round(float(np.percentile(values, p)), 2) if values else 0.0
+
+
+def make_corpus(n_files: int, chunks_per_file: int, words_per_chunk: int, rng: random.Random) -> Dict[str, Any]:
+    """Every file has its own topic words mixed with words shared by the whole corpus."""
+    files: Dict[str, List[str]] = {}
+    chunks: List[TextNode] = []
+    for f in range(n_files):
+        name = f"doc_{f:05d}.txt"
+        topic = [f"topic{f}x{i}" for i in range(12)]
+        files[name] = topic
+        for c in range(chunks_per_file):
+            words = [rng.choice(topic) if rng.random() < 0.3 else rng.choice(COMMON) for _ in range(words_per_chunk)]
+            chunks.append(TextNode(id_=f"{name}#{c}", text=" ".join(words), metadata={"file_name": name}))
+    return {"files": files, "chunks": chunks}
+
+
+def legacy_low_confidence(question: str, top_file: str, snippets: List[str], table: Dict[str, List[str]]) -> bool:
+    # The previous request-time checks: topic table scan + substring search over joined snippets
+    q = question.lower()
+    keys = table.get(top_file, [])
+    if keys and not any(k in q for k in keys):
+        return True
+    q_tokens = set(
+        w.strip(".,!?;:()[]{}'\"").lower() for w in question.split() if len(w) > 3 and w.lower() not in GENERIC_TERMS
+    )
+    combined_text = " ".join(s.lower() for s in snippets)
+    return bool(q_tokens) and not any(token in combined_text for token in q_tokens)
+
+
+def bench_size(n_files: int, args: argparse.Namespace, rng: random.Random) -> Dict[str, Any]:
+    corpus = make_corpus(n_files, args.chunks_per_file, args.words_per_chunk, rng)
+    files, chunks = corpus["files"], corpus["chunks"]
+    by_file: Dict[str, List[TextNode]] = {}
+    for node in chunks:
+        by_file.setdefault(node.metadata["file_name"], []).append(node)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        keywords = {n.node_id: frozenset(keyword_set(n.text)) for n in chunks}
+        sparse = SparseIndex(Path(tmp) / "bm25.npz")
+        sparse.add_nodes(chunks)
+        store = TopicStore(Path(tmp) / "topics.json")
+        store.rebuild({name: [n.node_id for n in nodes] for name, nodes in by_file.items()}, sparse)
+        ingest_s = time.perf_counter() - start
+
+        table = {name: topic[:6] for name, topic in files.items()}
+        requests = []
+        for i in range(args.requests):
+            name = rng.choice(list(files))
+            words = rng.sample(files[name], 2) + [f"word{i}", "how", "does"]
+            rng.shuffle(words)
+            top = by_file[name][: args.top_k]
+            requests.append(
+                {
+                    "question": " ".join(words) + "?",
+                    "file": name,
+                    "keywords": frozenset().union(*(keywords[n.node_id] for n in top)),
+                    "snippets": [make_snippet(n.text) for n in top],
+                }
+            )
+
+        question_terms.cache_clear()
+        sets_us = []
+        for r in requests:
+            t = time.perf_counter()
+            q_terms = question_terms(r["question"])
+            store.match(q_terms, r["file"]) and covers(q_terms, r["keywords"])
+            sets_us.append((time.perf_counter() - t) * 1e6)
+
+        legacy_us = []
+        for r in requests:
+            t = time.perf_counter()
+            legacy_low_confidence(r["question"], r["file"], r["snippets"], table)
+            legacy_us.append((time.perf_counter() - t) * 1e6)
+
+    return {
+        "files": n_files,
+        "chunks": len(chunks),
+        "ingest_s": round(ingest_s, 3),
+        "sets_us": {"p50": _percentile(sets_us, 50), "p95": _percentile(sets_us, 95)},
+        "legacy_us": {"p50": _percentile(legacy_us, 50), "p95": _percentile(legacy_us, 95)},
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Per-request cost of the relevance guard vs corpus size")
+    p.add_argument("--files", default="10,100,1000", help="comma-separated corpus sizes (files)")
+    p.add_argument("--chunks-per-file", type=int, default=20)
+    p.add_argument("--words-per-chunk", type=int, default=120)
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--top-k", type=int, default=4)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for n_files in [int(x) for x in args.files.split(",") if x.strip()]:
+        r = bench_size(n_files, args, rng)
+        results.append(r)
+        print(
+            f"{r['files']:>6} files {r['chunks']:>8} chunks | ingest {r['ingest_s']:>7.3f}s | "
+            f"sets p50 {r['sets_us']['p50']:>6.2f}us p95 {r['sets_us']['p95']:>6.2f}us | "
+            f"legacy p50 {r['legacy_us']['p50']:>6.2f}us p95 {r['legacy_us']['p95']:>6.2f}us"
+        )
+
+    report = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "chunks_per_file": args.chunks_per_file,
+        "words_per_chunk": args.words_per_chunk,
+        "requests": args.requests,
+        "top_k": args.top_k,
+        "results": results,
+    }
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    (REPORTS_DIR / "relevance_benchmark_latest.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import argparse
+import itertools
 import json
+import math
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -82,9 +87,7 @@ def evaluate_one(
     }
 
 
-def main():
-    api_url = os.getenv("API_URL", DEFAULT_API_URL)
-
+def run_regression(api_url: str) -> None:
     tests = load_tests(TESTS_PATH)
 
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -133,5 +136,202 @@ def main():
         raise SystemExit(1)
 
 
+# -----------------------------
+# Benchmark mode
+# -----------------------------
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(p / 100 * len(ordered))))
+    return round(ordered[rank - 1], 1)
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "mean": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "max": round(max(latencies), 1) if latencies else 0.0,
+    }
+
+
+def send_one(session: requests.Session, api_url: str, test: Dict[str, Any], timeout_s: int) -> Dict[str, Any]:
+    payload = {"question": test["question"], "top_k": int(test.get("top_k", 2))}
+    start = time.perf_counter()
+    try:
+        resp = session.post(f"{api_url}/ask", json=payload, timeout=timeout_s)
+        ok = resp.status_code == 200
+        agent = resp.json().get("agent") if ok else None
+        status = resp.status_code
+    except requests.RequestException as e:
+        ok, agent, status = False, None, type(e).__name__
+    return {
+        "id": test.get("id"),
+        "ok": ok,
+        "status": status,
+        "agent": agent or "error",
+        "end": time.perf_counter(),
+        "service_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def run_closed_loop(api_url: str, tests: List[Dict[str, Any]], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    `concurrency` workers, each sending its next request as soon as the previous one returns.
+    """
+    samples: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    questions = itertools.cycle(tests)
+    issued = itertools.count()
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    def worker() -> None:
+        session = requests.Session()
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            with lock:
+                n = next(issued)
+                test = next(questions)
+            if args.iterations and n >= args.iterations:
+                return
+            r = send_one(session, api_url, test, args.timeout)
+            r["latency_ms"] = r["service_ms"]
+            with lock:
+                samples.append(r)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+def run_open_loop(api_url: str, tests: List[Dict[str, Any]], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """
+    Requests are issued on a fixed schedule (`rate` per second) regardless of how fast the
+    server answers. Latency is measured from the *scheduled* send time, so queueing delay
+    is included (no coordinated omission).
+    """
+    samples: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    sessions = threading.local()
+    interval = 1.0 / args.rate
+
+    def fire(test: Dict[str, Any], scheduled: float) -> None:
+        if not hasattr(sessions, "s"):
+            sessions.s = requests.Session()
+        r = send_one(sessions.s, api_url, test, args.timeout)
+        r["latency_ms"] = (r["end"] - scheduled) * 1000
+        with lock:
+            samples.append(r)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for n, test in enumerate(itertools.cycle(tests)):
+            if args.iterations and n >= args.iterations:
+                break
+            scheduled = start + n * interval
+            if args.duration and scheduled - start >= args.duration:
+                break
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            pool.submit(fire, test, scheduled)
+    return samples
+
+
+def wait_for_ingest(api_url: str, timeout_s: int) -> None:
+    resp = requests.post(f"{api_url}/ingest", timeout=timeout_s)
+    if resp.status_code not in (202, 409):
+        raise SystemExit(f"Ingest failed: {resp.status_code} - {resp.text}")
+    job_id = resp.json()["job_id"]
+    while True:
+        job = requests.get(f"{api_url}/ingest/{job_id}", timeout=timeout_s).json()
+        if job["status"] not in ("queued", "running"):
+            print(f"Ingest {job['status']}: {job.get('result') or job.get('error')}")
+            return
+        time.sleep(1)
+
+
+def run_benchmark(api_url: str, args: argparse.Namespace) -> None:
+    tests = load_tests(TESTS_PATH)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    if args.ingest:
+        wait_for_ingest(api_url, args.timeout)
+
+    mode = "open" if args.rate else "closed"
+    if not args.duration and not args.iterations:
+        args.duration = 30
+
+    print(
+        f"Benchmark ({mode}-loop) against {api_url}: concurrency={args.concurrency}"
+        + (f", rate={args.rate}/s" if args.rate else "")
+        + (f", duration={args.duration}s" if args.duration else f", iterations={args.iterations}")
+    )
+
+    started = time.perf_counter()
+    samples = (run_open_loop if mode == "open" else run_closed_loop)(api_url, tests, args)
+    elapsed = time.perf_counter() - started
+
+    errors = [s for s in samples if not s["ok"]]
+    per_agent: Dict[str, List[float]] = {}
+    for s in samples:
+        per_agent.setdefault(s["agent"], []).append(s["latency_ms"])
+
+    summary = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "api_url": api_url,
+        "mode": mode,
+        "concurrency": args.concurrency,
+        "target_rate_rps": args.rate,
+        "elapsed_s": round(elapsed, 2),
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / max(1, len(samples)), 4),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": latency_stats([s["latency_ms"] for s in samples]),
+        "per_agent": {agent: latency_stats(lat) for agent, lat in sorted(per_agent.items())},
+    }
+    error_counts: Dict[str, int] = {}
+    for s in errors:
+        error_counts[str(s["status"])] = error_counts.get(str(s["status"]), 0) + 1
+
+    report = {"summary": summary, "errors_by_status": error_counts}
+
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    (REPORTS_DIR / f"benchmark_{ts}.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+    (REPORTS_DIR / "benchmark_latest.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print("\nSummary:", json.dumps(summary, indent=2))
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Regression evaluation and load benchmark for /ask")
+    p.add_argument("--benchmark", action="store_true", help="run the load benchmark instead of the regression suite")
+    p.add_argument("--concurrency", type=int, default=8, help="closed loop: workers; open loop: max in-flight requests")
+    p.add_argument("--rate", type=float, default=None, help="open loop: requests per second (omit for closed loop)")
+    p.add_argument("--duration", type=float, default=None, help="seconds to run (default 30 if no --iterations)")
+    p.add_argument("--iterations", type=int, default=None, help="total requests to send")
+    p.add_argument("--timeout", type=int, default=120, help="per-request timeout in seconds")
+    p.add_argument("--ingest", action="store_true", help="run /ingest and wait for it before benchmarking")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    api_url = os.getenv("API_URL", DEFAULT_API_URL)
+
+    if args.benchmark:
+        run_benchmark(api_url, args)
+    else:
+        run_regression(api_url)
+
+
 if __name__ == "__main__":
     main()
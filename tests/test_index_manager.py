@@ -0,0 +1,45 @@
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+
+from core_ai.rag_pipeline.indexing import index_manager, manifest, vector_store
+from core_ai.rag_pipeline.indexing.tenancy import current_collection
+
+
+def _ingest_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("VECTOR_BACKEND", "qdrant")
+    monkeypatch.setenv("QDRANT_URL", ":memory:")
+    monkeypatch.setenv("INDEX_STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setenv("INGEST_PARSE_WORKERS", "1")
+    monkeypatch.setattr(index_manager, "setup_local_embeddings", lambda: setattr(Settings, "embed_model", MockEmbedding(embed_dim=8)))
+    monkeypatch.setattr(manifest, "_kb_objects", manifest.OrderedDict())
+    vector_store.get_qdrant_client.cache_clear()
+    vector_store.get_async_qdrant_client.cache_clear()
+
+    data = tmp_path / "docs"
+    data.mkdir()
+    (data / "vpn.txt").write_text("VPN error 809 means the L2TP ports are blocked by the firewall.")
+    (data / "wifi.txt").write_text("Connect to the CORP wifi network with your domain account.")
+    return str(data)
+
+
+def test_dropped_collection_is_refilled(monkeypatch, tmp_path):
+    data_dir = _ingest_env(monkeypatch, tmp_path)
+    try:
+        first = index_manager.ingest_directory(data_dir)
+        assert first["added"] == 2 and first["chunks"] > 0
+
+        # Collection dropped behind the manifest's back, and one file edited meanwhile: stale
+        # chunks must not be deleted from the missing collection, and everything is re-indexed
+        vector_store.get_qdrant_client().delete_collection(current_collection())
+        (tmp_path / "docs" / "wifi.txt").write_text("Connect to the CORP-NEW wifi network with your domain account.")
+
+        second = index_manager.ingest_directory(data_dir)
+        assert second["updated"] == 2 and second["skipped"] == 0
+        assert second["chunks"] == first["chunks"]
+        assert vector_store.has_points(index_manager.get_index().vector_store)
+
+        third = index_manager.ingest_directory(data_dir)
+        assert third["skipped"] == 2 and third["chunks"] == 0
+    finally:
+        vector_store.get_qdrant_client.cache_clear()
+        vector_store.get_async_qdrant_client.cache_clear()